@@ -0,0 +1,217 @@
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+import torch
+
+from game_cabo import split_seed
+from train_ai_player import CaboAIPlayer, DQNPlayer, VecCaboEnv, shaped_transitions
+
+
+class TransitionQueue:
+    """单个行动者写、学习者读的共享内存环形队列
+
+    每行是一条经验：状态、下一状态、动作、奖励、是否结束，全部存成 float32。
+    written/read 是累计写入和读取的行数，各自只由一方修改。
+    """
+
+    def __init__(self, slots, state_size, ctx=mp):
+        self.slots = slots
+        self.state_size = state_size
+        self.width = 2 * state_size + 3
+        self.buffer = ctx.RawArray('f', slots * self.width)
+        self.written = ctx.Value('q', 0)
+        self.read = ctx.Value('q', 0)
+        self._attach()
+
+    def _attach(self):
+        self.rows = np.frombuffer(self.buffer, dtype=np.float32).reshape(self.slots, self.width)
+
+    def __getstate__(self):
+        # 只传共享内存本身，子进程里重新建 NumPy 视图
+        state = self.__dict__.copy()
+        del state['rows']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._attach()
+
+    def pack(self, transitions):
+        rows = np.empty((len(transitions), self.width), dtype=np.float32)
+        s = self.state_size
+        for row, (state, action, reward, next_state, done) in zip(rows, transitions):
+            row[:s] = state
+            row[s:2 * s] = next_state
+            row[2 * s:] = action, reward, done
+        return rows
+
+    def unpack(self, rows):
+        """拆成 ReplayMemory.extend 需要的五列"""
+        s = self.state_size
+        return (rows[:, :s], rows[:, 2 * s].astype(np.int64), rows[:, 2 * s + 1],
+                rows[:, s:2 * s], rows[:, 2 * s + 2])
+
+    def push(self, rows, stop):
+        """写入一批经验；队列满时等学习者读走，stop 置位后放弃写入"""
+        written = self.written.value
+        while self.slots - (written - self.read.value) < len(rows):
+            if stop.is_set():
+                return False
+            time.sleep(0.001)
+        indices = (written + np.arange(len(rows))) % self.slots
+        self.rows[indices] = rows
+        self.written.value = written + len(rows)
+        return True
+
+    def pop_all(self):
+        read = self.read.value
+        n = self.written.value - read
+        rows = self.rows[(read + np.arange(n)) % self.slots]
+        self.read.value = read + n
+        return rows
+
+
+class SharedWeights:
+    """学习者发布、行动者同步的共享网络参数（附版本号和当前 epsilon）"""
+
+    def __init__(self, model, ctx=mp):
+        self.size = sum(p.numel() for p in model.parameters())
+        self.buffer = ctx.RawArray('f', self.size)
+        self.version = ctx.Value('q', 0)
+        self.epsilon = ctx.Value('d', 1.0)
+        self.lock = ctx.Lock()
+
+    def _vector(self):
+        return torch.from_numpy(np.frombuffer(self.buffer, dtype=np.float32))
+
+    def publish(self, model, epsilon):
+        with self.lock, torch.no_grad():
+            self._vector().copy_(torch.nn.utils.parameters_to_vector(model.parameters()))
+            self.epsilon.value = epsilon
+            self.version.value += 1
+
+    def load(self, model, version):
+        """版本比 version 新时把参数拷进 model，返回拷贝后的版本号和 epsilon"""
+        if self.version.value == version:
+            return version, None
+        with self.lock, torch.no_grad():
+            torch.nn.utils.vector_to_parameters(self._vector().clone(), model.parameters())
+            return self.version.value, self.epsilon.value
+
+
+def run_actor(index, queue, weights, counters, stop, num_envs, sync_interval, gamma, seed):
+    """行动者进程：用最近同步的网络在 VecCaboEnv 上对局，整局结束后把经验推进共享队列
+
+    counters[2*index] 是累计环境步数，counters[2*index+1] 是累计对局数。
+    """
+    torch.set_num_threads(1)
+    actor_seed = None if seed is None else split_seed(seed, f"actor/{index}")
+    env = VecCaboEnv(num_envs, actor_seed)
+    player = DQNPlayer(f"行动者{index}", env.envs[0].rng)
+    version = 0
+    trajectories = [[] for _ in range(num_envs)]
+    states = env.states.copy()
+    step = 0
+    while not stop.is_set():
+        if step % sync_interval == 0:
+            version, epsilon = weights.load(player.model, version)
+            if epsilon is not None:
+                player.epsilon = epsilon
+        actions = player.choose_actions(states)
+        next_states, rewards, dones = env.step(actions)
+        finished = []
+        for i in range(num_envs):
+            trajectories[i].append((states[i].copy(), int(actions[i]), float(rewards[i])))
+            if dones[i]:
+                finished.extend(shaped_transitions(trajectories[i], env.final_states[i].copy(),
+                                                   env.score_diffs[i], gamma))
+                trajectories[i] = []
+                counters[2 * index + 1] += 1
+        states[:] = next_states
+        counters[2 * index] += num_envs
+        step += 1
+        if finished and not queue.push(queue.pack(finished), stop):
+            break
+
+
+class Throughput:
+    """按时间间隔统计累计计数器的增长速度"""
+
+    def __init__(self):
+        self.last = time.perf_counter()
+        self.previous = {}
+
+    def rates(self, **counts):
+        now = time.perf_counter()
+        elapsed = max(now - self.last, 1e-9)
+        rates = {name: (count - self.previous.get(name, 0)) / elapsed for name, count in counts.items()}
+        self.previous = counts
+        self.last = now
+        return rates
+
+
+def train_actor_learner(save_path="cabo_ai_model.pth", updates=100000, num_actors=None,
+                        envs_per_actor=16, sync_interval=20, publish_interval=50,
+                        queue_slots=65536, seed=None, prioritized=False, report_interval=10.0):
+    """行动者/学习者并行训练：num_actors 个进程采样，当前进程只做经验回放
+
+    学习者每 publish_interval 次更新发布一次参数（连同 epsilon），行动者每 sync_interval
+    个批量步检查一次新版本。每 report_interval 秒打印两边的吞吐量，并保存模型。
+    返回训练好的 CaboAIPlayer。
+    """
+    num_actors = num_actors or max(1, (os.cpu_count() or 2) - 1)
+    learner = CaboAIPlayer("学习者", None if seed is None else split_seed(seed, "learner"), prioritized)
+    if os.path.exists(save_path):
+        learner.load_model(save_path)
+
+    ctx = mp.get_context('spawn')  # 学习者已经初始化了torch，fork出的子进程可能卡在线程池上
+    queues = [TransitionQueue(queue_slots, learner.state_size, ctx) for _ in range(num_actors)]
+    weights = SharedWeights(learner.model, ctx)
+    weights.publish(learner.model, learner.epsilon)
+    counters = ctx.RawArray('q', 2 * num_actors)
+    stop = ctx.Event()
+    actors = [ctx.Process(target=run_actor, daemon=True,
+                          args=(i, queues[i], weights, counters, stop, envs_per_actor,
+                                sync_interval, learner.gamma, seed))
+              for i in range(num_actors)]
+    for actor in actors:
+        actor.start()
+
+    print(f"开始训练，{num_actors} 个行动者进程，每个 {envs_per_actor} 个环境")
+    throughput = Throughput()
+    received = 0
+    next_report = time.perf_counter() + report_interval
+    try:
+        while learner.steps < updates:
+            for queue in queues:
+                rows = queue.pop_all()
+                if len(rows):
+                    learner.memory.extend(*queue.unpack(rows))
+                    received += len(rows)
+            if len(learner.memory) > learner.batch_size:
+                learner.replay(learner.batch_size)
+                if learner.steps % publish_interval == 0:
+                    weights.publish(learner.model, learner.epsilon)
+            else:
+                time.sleep(0.01)
+
+            if time.perf_counter() >= next_report:
+                next_report += report_interval
+                rates = throughput.rates(env_steps=sum(counters[0::2]), episodes=sum(counters[1::2]),
+                                         transitions=received, updates=learner.steps)
+                print(f"更新: {learner.steps}, 环境步/秒: {rates['env_steps']:.0f}, "
+                      f"对局/秒: {rates['episodes']:.0f}, 经验/秒: {rates['transitions']:.0f}, "
+                      f"更新/秒: {rates['updates']:.1f}, Epsilon: {learner.epsilon:.3f}")
+                learner.save_model(save_path)
+    finally:
+        stop.set()
+        for actor in actors:
+            actor.join()
+    learner.save_model(save_path)
+    return learner
+
+
+if __name__ == "__main__":
+    train_actor_learner()
@@ -0,0 +1,74 @@
+import importlib
+import importlib.util
+import os
+from functools import partial
+
+# 可参加锦标赛/评估、人机对战的AI：名字 -> 工厂函数 factory(seed, **params)，返回一个新的 Player
+# 实现模块在第一次创建该AI时才导入，只用规则AI的进程不会加载搜索AI或torch
+AGENTS = {}
+
+
+class LazyAgent:
+    """按 "模块:名字" 延迟导入的工厂；名字指向 Player 子类时按 cls(name, rng=seed, **params) 创建"""
+
+    def __init__(self, name, target, **params):
+        self.name = name
+        self.module, self.attr = target.split(':')
+        self.params = params
+
+    def __call__(self, seed=None, **params):
+        factory = getattr(importlib.import_module(self.module), self.attr)
+        if isinstance(factory, type):
+            return factory(self.name, rng=seed, **{**self.params, **params})
+        return factory(seed, **params)
+
+
+def register_agent(name, factory=None, **params):
+    """注册一个AI；可以直接调用，也可以作为装饰器用在 Player 子类或工厂函数上
+
+    Player 子类按 cls(name, rng=seed, **params) 创建；factory 也可以是 "模块:名字" 字符串，
+    这时模块到第一次创建该AI时才导入。
+    """
+    def register(factory):
+        if isinstance(factory, str):
+            AGENTS[name] = LazyAgent(name, factory, **params)
+        elif isinstance(factory, type):
+            cls = factory
+            AGENTS[name] = lambda seed=None, **overrides: cls(name, rng=seed, **{**params, **overrides})
+        else:
+            AGENTS[name] = factory
+        return factory
+
+    if factory is not None:
+        return register(factory)
+    return register
+
+
+def create_agent(name, seed=None, **params):
+    """创建一个AI；params 覆盖注册时的构造参数（例如人机对战时搜索AI改用固定思考时间）"""
+    if name not in AGENTS:
+        raise ValueError(f"未注册的AI: {name}（可选: {', '.join(AGENTS)}）")
+    return AGENTS[name](seed, **params)
+
+
+register_agent("random", "smart_cabo_players:RandomPlayer")
+register_agent("smart", "smart_cabo_players:SmartPlayer")
+register_agent("mcts", "smart_cabo_players:MCTSPlayer", iterations=500)
+register_agent("expectimax", "expectimax:ExpectimaxPlayer")
+
+
+def _dqn_agent(seed=None, model_path="cabo_ai_model.pth"):
+    """贪心（不探索）的DQN玩家；有最新的推理文件（.cabq/.npz）时不导入torch，进程池里的每个进程都更轻"""
+    from dqn_numpy import greedy_player
+    return greedy_player(os.path.basename(model_path), model_path, seed)
+
+
+def register_checkpoint(name, model_path):
+    """把某个DQN模型文件注册为一个AI（例如比较新旧两个检查点）"""
+    return register_agent(name, partial(_dqn_agent, model_path=model_path))
+
+
+# 只检查torch是否安装、导出的权重是否存在，不导入任何东西
+_EXPORTS = ("cabo_ai_model.cabq", "cabo_ai_model.npz")
+if importlib.util.find_spec("torch") is not None or any(map(os.path.exists, _EXPORTS)):
+    register_agent("dqn", _dqn_agent)
@@ -0,0 +1,267 @@
+import numpy as np
+
+from game_cabo import (CARDS, HAND_SIZE, DRAW, CABO, DISCARD, REPLACE, PEEK, SWAP,
+                       NUM_ACTIONS)
+from cabo_state import CompactState, SLOT_BITS, OPP_SHIFT, OWN_ORDER_BIT, OPP_ORDER_BIT
+
+DECK_SIZE = len(CARDS)
+NUMBERS = np.array([card.number for card in CARDS], dtype=np.int8)
+PEEK_ID = next(cid for cid, card in enumerate(CARDS) if card.skill == 'Peek')
+SWAP_ID = next(cid for cid, card in enumerate(CARDS) if card.skill == 'Swap')
+UNKNOWN = -1
+
+
+class BatchGame:
+    """用NumPy数组同时保存N局两人Cabo，每次调用 step 让所有未结束的对局各走一个回合
+
+    规则与 Game.apply 完全一致。策略是向量化函数 policy(batch, games, drawn)：
+    games 是轮到该策略行动的对局下标，drawn 为 None 时表示回合开始（返回 DRAW/CABO），
+    否则是这些对局刚摸到的卡牌ID（返回处理这张牌的引擎动作）。
+    """
+
+    def __init__(self, n_games, seed=None, decks=None):
+        self.n_games = n_games
+        self.rng = np.random.default_rng(seed)
+        self.reset(decks)
+
+    def reset(self, decks=None):
+        """洗牌（或使用给定的 (N, 10) 牌序）、发牌并让双方随机偷看一张自己的牌"""
+        n = self.n_games
+        games = np.arange(n)
+        # 每局一副随机排列的牌，最后一列是堆顶
+        if decks is None:
+            self.deck = np.argsort(self.rng.random((n, DECK_SIZE)), axis=1).astype(np.int8)
+        else:
+            self.deck = np.array(decks, dtype=np.int8).reshape(n, DECK_SIZE)
+        self.deck_size = np.full(n, DECK_SIZE, dtype=np.int8)
+        self.hands = np.empty((n, 2, HAND_SIZE), dtype=np.int8)
+        # 与 Game.deal 相同：玩家A先从堆顶拿两张，再轮到玩家B
+        for p in range(2):
+            for pos in range(HAND_SIZE):
+                self.deck_size -= 1
+                self.hands[:, p, pos] = self.deck[games, self.deck_size]
+
+        # 记住的牌（卡牌ID，-1为未知）以及两张都记住时字典里先记住的位置
+        self.known = np.full((n, 2, HAND_SIZE), UNKNOWN, dtype=np.int8)
+        self.known_opp = np.full((n, 2, HAND_SIZE), UNKNOWN, dtype=np.int8)
+        self.known_first = np.zeros((n, 2), dtype=np.int8)
+        self.opp_first = np.zeros((n, 2), dtype=np.int8)
+
+        self.discard = np.full((n, DECK_SIZE), UNKNOWN, dtype=np.int8)
+        self.discard_size = np.zeros(n, dtype=np.int8)
+        self.current = np.zeros(n, dtype=np.int8)
+        self.caller = np.full(n, UNKNOWN, dtype=np.int8)
+        self.done = np.zeros(n, dtype=bool)
+
+        # 初始偷看
+        for p in range(2):
+            pos = self.rng.integers(0, HAND_SIZE, n)
+            seat = np.full(n, p)
+            self._remember(self.known, self.known_first, games, seat, pos, self.hands[games, p, pos])
+
+    def step(self, policies):
+        """所有未结束的对局各推进一个回合，policies 按座位给出两位玩家的策略，返回推进的对局数"""
+        active = np.flatnonzero(~self.done)
+        if active.size == 0:
+            return 0
+        seat = self.current[active].astype(np.intp)
+
+        # 回合开始：呼叫Cabo或摸牌
+        actions = self._decide(policies, active, seat, None)
+        if np.any((actions != DRAW) & ((actions != CABO) | (self.caller[active] != UNKNOWN))):
+            raise ValueError("回合开始只能摸牌或在无人呼叫时呼叫Cabo")
+        calls = actions == CABO
+        self.caller[active[calls]] = seat[calls]
+
+        games, seat = active[~calls], seat[~calls]
+        self.deck_size[games] -= 1
+        drawn = self.deck[games, self.deck_size[games]]
+        actions = self._decide(policies, games, seat, drawn)
+        self._resolve(games, seat, drawn, actions)
+
+        # 牌堆耗尽，或者有人叫了Cabo且对手也完成了最后一回合，游戏结束
+        seat = self.current[active]
+        caller = self.caller[active]
+        over = (self.deck_size[active] == 0) | ((caller != UNKNOWN) & (caller != seat))
+        self.done[active[over]] = True
+        self.current[active] = 1 - seat
+        return active.size
+
+    def run(self, policies):
+        """一直推进到所有对局结束，返回最终得分"""
+        while self.step(policies):
+            pass
+        return self.final_scores()
+
+    def hand_scores(self):
+        return NUMBERS[self.hands].sum(axis=2, dtype=np.int16)
+
+    def final_scores(self):
+        """按Cabo规则计算最终得分，形状为 (N, 2)"""
+        scores = self.hand_scores()
+        games = np.flatnonzero(self.caller != UNKNOWN)
+        caller = self.caller[games].astype(np.intp)
+        caller_score = scores[games, caller]
+        lowest = caller_score <= scores[games, 1 - caller]
+        scores[games, caller] = np.where(lowest, 0, caller_score + 5)
+        return scores
+
+    def to_compact(self, i):
+        """把第i局转换为 CompactState，便于与 Game 对象互转"""
+        knowledge = []
+        for p in range(2):
+            bits = 0
+            for pos in range(HAND_SIZE):
+                bits |= (int(self.known[i, p, pos]) + 1) << (SLOT_BITS * pos)
+                bits |= (int(self.known_opp[i, p, pos]) + 1) << (OPP_SHIFT + SLOT_BITS * pos)
+            if np.all(self.known[i, p] != UNKNOWN) and self.known_first[i, p] == 1:
+                bits |= OWN_ORDER_BIT
+            if np.all(self.known_opp[i, p] != UNKNOWN) and self.opp_first[i, p] == 1:
+                bits |= OPP_ORDER_BIT
+            knowledge.append(bits)
+        size = int(self.deck_size[i])
+        return CompactState(
+            deck=tuple(int(cid) for cid in self.deck[i, :size]),
+            hands=tuple(tuple(int(cid) for cid in hand) for hand in self.hands[i]),
+            discard=tuple(int(cid) for cid in self.discard[i, :self.discard_size[i]]),
+            knowledge=tuple(knowledge),
+            current=int(self.current[i]),
+            caller=int(self.caller[i]),
+            drawn=UNKNOWN,
+            over=bool(self.done[i]),
+        )
+
+    def _decide(self, policies, games, seat, drawn):
+        actions = np.empty(games.size, dtype=np.int8)
+        for p, policy in enumerate(policies):
+            mine = seat == p
+            if np.any(mine):
+                actions[mine] = policy(self, games[mine], None if drawn is None else drawn[mine])
+        return actions
+
+    def _resolve(self, games, seat, drawn, actions):
+        """处理摸到的牌"""
+        is_number = (drawn != PEEK_ID) & (drawn != SWAP_ID)
+        replace = (actions >= REPLACE) & (actions < PEEK)
+        peek = (actions >= PEEK) & (actions < SWAP)
+        swap = (actions >= SWAP) & (actions < NUM_ACTIONS)
+        legal = ((actions == DISCARD) | (replace & is_number)
+                 | (peek & (drawn == PEEK_ID)) | (swap & (drawn == SWAP_ID)))
+        if not np.all(legal):
+            raise ValueError("策略返回了非法动作")
+
+        # 用摸到的牌替换自己的一张牌，换下的牌进入弃牌堆
+        g, s, card = games[replace], seat[replace], drawn[replace]
+        pos = (actions[replace] - REPLACE).astype(np.intp)
+        self._push_discard(g, self.hands[g, s, pos])
+        self.hands[g, s, pos] = card
+        self._remember(self.known, self.known_first, g, s, pos, card)
+
+        # 偷看对手的一张牌
+        g, s = games[peek], seat[peek]
+        pos = (actions[peek] - PEEK).astype(np.intp)
+        self._remember(self.known_opp, self.opp_first, g, s, pos, self.hands[g, 1 - s, pos])
+
+        # 交换双方各一张牌，并更新双方的已知牌信息
+        g, s = games[swap], seat[swap]
+        my_pos, opp_pos = np.divmod((actions[swap] - SWAP).astype(np.intp), HAND_SIZE)
+        my_card = self.hands[g, s, my_pos]
+        opp_card = self.hands[g, 1 - s, opp_pos]
+        self.hands[g, s, my_pos] = opp_card
+        self.hands[g, 1 - s, opp_pos] = my_card
+        # 当前玩家记得自己换出去的牌，现在它在对手那里
+        mine = self.known[g, s, my_pos] != UNKNOWN
+        self._remember(self.known_opp, self.opp_first, g[mine], s[mine], opp_pos[mine], my_card[mine])
+        self._forget(self.known, self.known_first, g[mine], s[mine], my_pos[mine])
+        # 对手记得被换走的牌，现在它在当前玩家那里
+        theirs = self.known[g, 1 - s, opp_pos] != UNKNOWN
+        o = 1 - s[theirs]
+        self._remember(self.known_opp, self.opp_first, g[theirs], o, my_pos[theirs], opp_card[theirs])
+        self._forget(self.known, self.known_first, g[theirs], o, opp_pos[theirs])
+
+        # 除替换外，摸到的牌都进入弃牌堆
+        self._push_discard(games[~replace], drawn[~replace])
+
+    def _push_discard(self, games, cards):
+        self.discard[games, self.discard_size[games]] = cards
+        self.discard_size[games] += 1
+
+    @staticmethod
+    def _remember(memory, first, games, seat, pos, cards):
+        # 新记住的位置排在字典末尾；已记住的位置更新后顺序不变
+        new = memory[games, seat, pos] == UNKNOWN
+        other_known = memory[games, seat, 1 - pos] != UNKNOWN
+        first[games[new], seat[new]] = np.where(other_known[new], 1 - pos[new], pos[new])
+        memory[games, seat, pos] = cards
+
+    @staticmethod
+    def _forget(memory, first, games, seat, pos):
+        memory[games, seat, pos] = UNKNOWN
+        first[games, seat] = 1 - pos
+
+
+def _ordered_pick(ok0, ok1, first):
+    """两个位置都满足条件时按记忆顺序取先记住的位置（对应按字典顺序遍历）"""
+    return np.where(ok0 & ok1, first, np.where(ok0, 0, 1))
+
+
+def smart_policy(batch, games, drawn):
+    """与 SmartPlayer.should_call_cabo / decide_action_for_drawn_card 等价的向量化策略"""
+    seat = batch.current[games].astype(np.intp)
+    known = batch.known[games, seat]
+    is_known = known != UNKNOWN
+    values = np.where(is_known, NUMBERS[known], 0)
+
+    if drawn is None:
+        count = is_known.sum(axis=1)
+        total = values.sum(axis=1)
+        call = count > 0
+        call &= ((total <= 2 * count)                            # 已知牌平均分不超过2
+                 | ((count == HAND_SIZE) & (total <= 5))        # 知道所有牌且总分较低
+                 | np.any(is_known & (values <= 1), axis=1))    # 知道一张牌是1
+        call &= batch.caller[games] == UNKNOWN
+        return np.where(call, CABO, DRAW).astype(np.int8)
+
+    actions = np.full(games.size, DISCARD, dtype=np.int8)
+    first = batch.known_first[games, seat]
+
+    # 普通牌：按记忆顺序找第一张比摸到的牌大的已知牌进行替换
+    number = (drawn != PEEK_ID) & (drawn != SWAP_ID)
+    better = is_known & (NUMBERS[drawn][:, None] < values)
+    ok = number & better.any(axis=1)
+    pos = _ordered_pick(better[:, 0], better[:, 1], first)
+    actions[ok] = REPLACE + pos[ok]
+
+    # 偷看：随机偷看一张还不知道的对手牌
+    opp_unknown = batch.known_opp[games, seat] == UNKNOWN
+    ok = (drawn == PEEK_ID) & opp_unknown.any(axis=1)
+    coin = batch.rng.integers(0, HAND_SIZE, games.size)
+    pos = np.where(opp_unknown.all(axis=1), coin, np.argmax(opp_unknown, axis=1))
+    actions[ok] = PEEK + pos[ok]
+
+    # 交换：自己已知最大的牌不小于4、对手已知最小的牌不大于2时交换这两张
+    opp_known = batch.known_opp[games, seat]
+    opp_is_known = opp_known != UNKNOWN
+    opp_values = np.where(opp_is_known, NUMBERS[opp_known], 6)
+    my_values = np.where(is_known, values, -1)
+    my_max = my_values.max(axis=1)
+    opp_min = opp_values.min(axis=1)
+    my_pos = _ordered_pick(my_values[:, 0] == my_max, my_values[:, 1] == my_max, first)
+    opp_first = batch.opp_first[games, seat]
+    opp_pos = _ordered_pick(opp_values[:, 0] == opp_min, opp_values[:, 1] == opp_min, opp_first)
+    ok = (drawn == SWAP_ID) & (my_max >= 4) & (opp_min <= 2)
+    actions[ok] = SWAP + my_pos[ok] * HAND_SIZE + opp_pos[ok]
+    return actions
+
+
+def random_policy(batch, games, drawn):
+    """在合法动作中均匀随机选择"""
+    rng = batch.rng
+    if drawn is None:
+        can_call = batch.caller[games] == UNKNOWN
+        call = can_call & (rng.random(games.size) < 0.5)
+        return np.where(call, CABO, DRAW).astype(np.int8)
+    n_options = np.where(drawn == SWAP_ID, HAND_SIZE * HAND_SIZE, HAND_SIZE) + 1
+    choice = (rng.random(games.size) * n_options).astype(np.int8)
+    base = np.where(drawn == PEEK_ID, PEEK, np.where(drawn == SWAP_ID, SWAP, REPLACE))
+    return np.where(choice == 0, DISCARD, base + choice - 1).astype(np.int8)
@@ -0,0 +1,171 @@
+from game_cabo import DRAW, CABO
+
+UNKNOWN = -1
+
+
+class BeliefTracker:
+    """某位玩家视角下对所有隐藏牌的概率分布，按牌局事件增量更新
+
+    未确定位置的牌（牌堆、对手摸到的牌、不知道的手牌）彼此可交换，所以每个未知位置的边缘分布
+    都等于"还没见过的牌"的多重集合。这里只维护各类牌未见过的张数、总数和点数和，
+    每个事件 O(1) 更新，查询某张牌的分布或一手牌的期望点数不需要回看历史。
+
+    作为观察者挂到 Game 上（game.add_observer）即可自动更新；也可以直接调用 on_* 方法驱动。
+    与引擎里的 known_opponent_cards 不同，对手替换掉一张已知的牌后，这里会把该位置重新视为未知。
+    """
+
+    def __init__(self, seat, cards, num_players=2, hand_size=2):
+        self.seat = seat
+        self.num_players = num_players
+        self.hand_size = hand_size
+        # 按 (点数, 技能) 把牌组分类，分布以类为单位
+        self.kinds = []
+        for card in cards:
+            if (card.number, card.skill) not in self.kinds:
+                self.kinds.append((card.number, card.skill))
+        self._kind = {kind: i for i, kind in enumerate(self.kinds)}
+        self.kind_numbers = [number for number, _ in self.kinds]
+        self.total_counts = [0] * len(self.kinds)
+        for card in cards:
+            self.total_counts[self._kind[card.number, card.skill]] += 1
+        self.reset()
+
+    @classmethod
+    def for_game(cls, game, seat):
+        return cls(seat, game.cards, len(game.players), game.hand_size)
+
+    def reset(self):
+        """新的一局：所有牌都没见过"""
+        self.unseen = list(self.total_counts)
+        self.unseen_total = sum(self.unseen)
+        self.unseen_sum = sum(n * c for n, c in zip(self.kind_numbers, self.unseen))
+        self.slots = [[UNKNOWN] * self.hand_size for _ in range(self.num_players)]
+        self.drawn = UNKNOWN
+        self._synced = False
+
+    def sync(self, game):
+        """从牌局当前的公开信息和玩家记忆重建（用于牌局进行中才开始追踪的情况）
+
+        对手的已知牌取自引擎的 known_opponent_cards，它在对手换牌后不会更新，
+        所以应在偷看对手之前、或刚偷看完时调用。
+        """
+        self.reset()
+        player = game.players[self.seat]
+        for pos, card in player.known_cards.items():
+            self.see(self.seat, pos, card)
+        for slot, card in player.known_opponent_cards.items():
+            self.see(*game.slot_owner(self.seat, slot), card)
+        for card in game.discard_pile:
+            self._reveal(self.kind_of(card))
+        if game.drawn_card is not None and game.current_player == self.seat:
+            self.draw(self.seat, game.drawn_card)
+        self._synced = True
+
+    def kind_of(self, card):
+        return self._kind[card.number, card.skill]
+
+    def _reveal(self, kind):
+        self.unseen[kind] -= 1
+        self.unseen_total -= 1
+        self.unseen_sum -= self.kind_numbers[kind]
+
+    # ---------- 事件 ----------
+
+    def see(self, seat, pos, card):
+        """看到了 seat 的第 pos 张牌（开局偷看、技能偷看）"""
+        if self.slots[seat][pos] == UNKNOWN:
+            kind = self.kind_of(card)
+            self._reveal(kind)
+            self.slots[seat][pos] = kind
+
+    def draw(self, seat, card):
+        if seat == self.seat:
+            kind = self.kind_of(card)
+            self._reveal(kind)
+            self.drawn = kind
+
+    def discard(self, seat, card):
+        """摸到的牌直接弃掉，所有人都看到"""
+        if seat != self.seat:
+            self._reveal(self.kind_of(card))
+        self.drawn = UNKNOWN
+
+    def replace(self, seat, pos, old_card):
+        """摸到的牌换掉 seat 的第 pos 张，换下的牌正面朝上进入弃牌堆"""
+        if self.slots[seat][pos] == UNKNOWN:
+            self._reveal(self.kind_of(old_card))
+        if seat == self.seat:
+            self.slots[seat][pos] = self.drawn
+        else:
+            self.slots[seat][pos] = UNKNOWN
+        self.drawn = UNKNOWN
+
+    def swap(self, seat, my_pos, opp_seat, opp_pos):
+        """交换两张牌的位置（不翻开），位置上的已知信息随牌移动"""
+        mine, theirs = self.slots[seat], self.slots[opp_seat]
+        mine[my_pos], theirs[opp_pos] = theirs[opp_pos], mine[my_pos]
+
+    # ---------- 作为 Game 的观察者 ----------
+
+    def on_deal(self, game):
+        self.reset()
+
+    def on_move(self, game, action):
+        if not self._synced:
+            # 开局偷看不经过引擎，在第一个动作前从玩家记忆补上
+            for pos, card in game.players[self.seat].known_cards.items():
+                self.see(self.seat, pos, card)
+            self._synced = True
+        seat = game.current_player
+        if action == DRAW:
+            self.draw(seat, game.deck[-1])
+            return
+        if action == CABO:
+            return
+        kind, *args = game.unpack(action)
+        card = game.drawn_card
+        if kind == "replace":
+            self.replace(seat, args[0], game.players[seat].hand[args[0]])
+            return
+        if kind == "peek":
+            opp_seat, pos = game.slot_owner(seat, args[0])
+            if seat == self.seat:
+                self.see(opp_seat, pos, game.players[opp_seat].hand[pos])
+        elif kind == "swap":
+            opp_seat, opp_pos = game.slot_owner(seat, args[1])
+            self.swap(seat, args[0], opp_seat, opp_pos)
+        # 偷看和交换后技能牌同样进入弃牌堆
+        self.discard(seat, card)
+
+    def on_end(self, game):
+        pass
+
+    # ---------- 查询 ----------
+
+    def distribution(self, seat, pos):
+        """seat 第 pos 张牌属于各类牌的概率（类别见 self.kinds）"""
+        kind = self.slots[seat][pos]
+        if kind != UNKNOWN:
+            return [1.0 if i == kind else 0.0 for i in range(len(self.kinds))]
+        return [count / self.unseen_total for count in self.unseen]
+
+    def unknown_mean(self):
+        """任意一个未知位置的期望点数"""
+        return self.unseen_sum / self.unseen_total if self.unseen_total else 0.0
+
+    def expected_card(self, seat, pos):
+        kind = self.slots[seat][pos]
+        return self.kind_numbers[kind] if kind != UNKNOWN else self.unknown_mean()
+
+    def expected_hand(self, seat=None):
+        """一手牌的期望点数（默认是自己的）"""
+        seat = self.seat if seat is None else seat
+        mean = self.unknown_mean()
+        return sum(self.kind_numbers[kind] if kind != UNKNOWN else mean
+                   for kind in self.slots[seat])
+
+
+def attach_beliefs(game):
+    """给每位玩家创建一个信念追踪器并挂到牌局上，返回按座位排列的列表"""
+    return [game.add_observer(BeliefTracker.for_game(game, seat))
+            for seat in range(len(game.players))]
@@ -0,0 +1,58 @@
+import math
+import time
+import tracemalloc
+
+from game_cabo import Game, make_cards
+from smart_cabo_players import SmartPlayer
+
+
+def scaled_cards(num_players, hand_size):
+    """按牌桌大小放大的牌组：1-4每种点数的张数随总手牌数增加，技能牌每两人一对"""
+    copies = max(2, math.ceil(num_players * hand_size / 2))
+    skills = max(1, num_players // 2)
+    return make_cards({number: copies for number in range(1, 5)}, peek=skills, swap=skills)
+
+
+def make_game(num_players, hand_size):
+    game = Game(num_players, hand_size, scaled_cards(num_players, hand_size))
+    game.players = [SmartPlayer(f"玩家{i + 1}") for i in range(num_players)]
+    return game
+
+
+def games_per_second(num_players, hand_size, seconds=1.0):
+    """同一个 Game 对象反复 reset_table 后自动打完，统计每秒局数"""
+    game = make_game(num_players, hand_size)
+    games = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        game.reset_table()
+        game.run()
+        games += 1
+    return games / (time.perf_counter() - start)
+
+
+def memory_per_game(num_players, hand_size, count=200):
+    """发完牌的一局（牌桌、玩家和记忆）平均占用的字节数"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    games = []
+    for _ in range(count):
+        game = make_game(num_players, hand_size)
+        game.deal()
+        for player in game.players:
+            player.peek_card(player.decide_peek_initial())
+        games.append(game)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    total = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return total / count
+
+
+if __name__ == "__main__":
+    print(f"{'人数':>4} {'手牌':>4} {'牌数':>4} {'局/秒':>10} {'字节/局':>10}")
+    for num_players in (2, 3, 4, 6, 8):
+        for hand_size in (2, 4, 6):
+            cards = len(scaled_cards(num_players, hand_size))
+            rate = games_per_second(num_players, hand_size)
+            memory = memory_per_game(num_players, hand_size)
+            print(f"{num_players:>4} {hand_size:>4} {cards:>4} {rate:>10.0f} {memory:>10.0f}")
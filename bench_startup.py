@@ -0,0 +1,58 @@
+import os
+import statistics
+import subprocess
+import sys
+
+# 冷启动入口：名字 -> 在全新解释器里执行的语句
+ENTRY_POINTS = {
+    "game_cabo": "import game_cabo",
+    "agents": "import agents",
+    "tournament": "import tournament",
+    "play_with_ai": "import play_with_ai",
+    "train_ai_player": "import train_ai_player",
+}
+
+# 子进程里计时：只算入口语句本身，解释器启动另外统计
+_PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+exec({statement!r})
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, int('torch' in sys.modules))
+"""
+
+
+def agent_entry_points():
+    """每个已注册AI的冷启动：导入注册表并创建一个实例（含它延迟导入的实现模块）"""
+    import agents
+    return {f"agent:{name}": f"import agents; agents.create_agent({name!r}, 0)" for name in agents.AGENTS}
+
+
+def cold_start(statement, repeat=5):
+    """在 repeat 个全新的解释器里执行 statement，返回 (语句耗时中位数秒, 进程总耗时中位数秒,
+    峰值内存MB, 是否导入了torch)"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get('PYTHONPATH')])))
+    timings, totals, peaks, torch = [], [], [], False
+    for _ in range(repeat):
+        before = os.times()
+        output = subprocess.run([sys.executable, "-c", _PROBE.format(statement=statement)], cwd=here,
+                                env=env, capture_output=True, text=True, check=True).stdout
+        after = os.times()
+        elapsed, peak_kb, imported = output.split()[-3:]
+        timings.append(float(elapsed))
+        totals.append(after.elapsed - before.elapsed)
+        peaks.append(int(peak_kb) / 1024)
+        torch = torch or imported == '1'
+    return statistics.median(timings), statistics.median(totals), max(peaks), torch
+
+
+if __name__ == "__main__":
+    print(f"{'入口':<24} {'导入(ms)':>10} {'进程(ms)':>10} {'内存(MB)':>10} {'torch':>6}")
+    for name, statement in {**ENTRY_POINTS, **agent_entry_points()}.items():
+        try:
+            timing, total, peak, torch = cold_start(statement)
+        except subprocess.CalledProcessError as error:
+            print(f"{name:<24} 失败: {error.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{name:<24} {timing * 1000:>10.0f} {total * 1000:>10.0f} {peak:>10.1f} {'是' if torch else '否':>6}")
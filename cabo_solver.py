@@ -0,0 +1,189 @@
+import os
+import pickle
+import time
+
+from game_cabo import Game, DRAW, CABO, unpack_action
+from deal_index import KINDS, NUM_DEALS, CARD_KIND, card_kind, deal_cards, unrank_deck
+
+KIND_NUMBERS = tuple(number for number, _ in KINDS)
+PEEK_KIND = KINDS.index((5, 'Peek'))
+SWAP_KIND = KINDS.index((5, 'Swap'))
+
+# 局面里记录Cabo状态（以轮到的玩家为视角）
+NO_CABO = 0
+I_CALLED = 1
+THEY_CALLED = 2
+FLIP_CABO = (NO_CABO, THEY_CALLED, I_CALLED)  # 换成对手视角
+
+
+def terminal_value(mine, theirs, cabo):
+    """终局时轮到的玩家视角下的得分差（对手最终得分 - 自己最终得分）"""
+    my_score = sum(mine)
+    their_score = sum(theirs)
+    # 叫Cabo的玩家分数最低得0分，否则加5分罚分
+    if cabo == I_CALLED:
+        my_score = 0 if my_score <= their_score else my_score + 5
+    elif cabo == THEY_CALLED:
+        their_score = 0 if their_score <= my_score else their_score + 5
+    return their_score - my_score
+
+
+def _replace(hand, pos, number):
+    return tuple(sorted(hand[:pos] + (number,) + hand[pos + 1:]))
+
+
+class CaboSolver:
+    """完全信息下（双方都能看到所有牌和牌序）的精确极小极大求解器
+
+    局面规范化为 (剩余牌堆的类别, 自己的手牌点数, 对手的手牌点数, Cabo状态, 摸到的牌类别)，
+    其中手牌排序、视角固定为轮到的玩家，值为该玩家视角下的终局得分差。
+    置换表在所有牌局之间共享，可以保存到磁盘供以后直接加载。
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.table = {}
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                self.table = pickle.load(f)
+
+    def save(self, path=None):
+        path = path or self.path
+        with open(path, 'wb') as f:
+            pickle.dump(self.table, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def value(self, state):
+        """规范化局面的精确值（轮到的玩家视角）"""
+        table = self.table
+        cached = table.get(state)
+        if cached is not None:
+            return cached
+
+        deck, mine, theirs, cabo, drawn = state
+        if drawn < 0:
+            # 回合开始：摸牌或呼叫Cabo
+            best = self.value((deck[:-1], mine, theirs, cabo, deck[-1]))
+            if cabo == NO_CABO:
+                best = max(best, -self.value((deck, theirs, mine, THEY_CALLED, -1)))
+        else:
+            best = max(self._end_turn(deck, hand, their_hand, cabo)
+                       for hand, their_hand in self._outcomes(mine, theirs, drawn))
+        table[state] = best
+        return best
+
+    def _outcomes(self, mine, theirs, drawn):
+        """处理摸到的牌后双方手牌的所有可能结果（弃牌与偷看在完全信息下等价）"""
+        yield mine, theirs
+        if drawn == SWAP_KIND:
+            for i in range(len(mine)):
+                if i and mine[i] == mine[i - 1]:
+                    continue
+                for j in range(len(theirs)):
+                    if j and theirs[j] == theirs[j - 1]:
+                        continue
+                    yield _replace(mine, i, theirs[j]), _replace(theirs, j, mine[i])
+        elif drawn != PEEK_KIND:
+            number = KIND_NUMBERS[drawn]
+            for i in range(len(mine)):
+                if not (i and mine[i] == mine[i - 1]):
+                    yield _replace(mine, i, number), theirs
+
+    def _end_turn(self, deck, mine, theirs, cabo):
+        # 牌堆耗尽，或者对手叫了Cabo而自己完成了最后一回合，游戏结束
+        if not deck or cabo == THEY_CALLED:
+            return terminal_value(mine, theirs, cabo)
+        return -self.value((deck, theirs, mine, FLIP_CABO[cabo], -1))
+
+    # ---------- 与 Game 对象对接 ----------
+
+    @staticmethod
+    def game_state(game):
+        """把 Game 的当前局面规范化（以当前玩家为视角）"""
+        me = game.players[game.current_player]
+        opponent = game.players[1 - game.current_player]
+        if not game.cabo_called:
+            cabo = NO_CABO
+        else:
+            cabo = I_CALLED if game.cabo_caller is me else THEY_CALLED
+        drawn = card_kind(game.drawn_card) if game.drawn_card is not None else -1
+        return (tuple(card_kind(card) for card in game.deck),
+                tuple(sorted(card.number for card in me.hand)),
+                tuple(sorted(card.number for card in opponent.hand)),
+                cabo, drawn)
+
+    def action_values(self, game):
+        """当前玩家每个合法动作的精确值"""
+        deck, _, _, cabo, drawn = self.game_state(game)
+        me = game.players[game.current_player]
+        opponent = game.players[1 - game.current_player]
+        mine = [card.number for card in me.hand]
+        theirs = [card.number for card in opponent.hand]
+        values = {}
+        for action in game.legal_actions():
+            kind, *args = unpack_action(action)
+            if action == DRAW:
+                values[action] = self.value((deck[:-1], tuple(sorted(mine)), tuple(sorted(theirs)),
+                                             cabo, deck[-1]))
+                continue
+            if action == CABO:
+                values[action] = -self.value((deck, tuple(sorted(theirs)), tuple(sorted(mine)),
+                                              THEY_CALLED, -1))
+                continue
+            hand, their_hand = list(mine), list(theirs)
+            if kind == "replace":
+                hand[args[0]] = game.drawn_card.number
+            elif kind == "swap":
+                i, j = args
+                hand[i], their_hand[j] = their_hand[j], hand[i]
+            values[action] = self._end_turn(deck, tuple(sorted(hand)), tuple(sorted(their_hand)), cabo)
+        return values
+
+    def grade(self, game, action):
+        """动作相对最优动作损失的分数（0表示最优）"""
+        values = self.action_values(game)
+        return max(values.values()) - values[action]
+
+    def grade_deal(self, rank, make_players):
+        """让 make_players() 创建的玩家打完第 rank 种牌局，返回每一步 (座位, 动作, 损失)"""
+        game = Game()
+        game.players = make_players()
+        game.reset_table(deal_cards(rank))
+        game.deal()
+        for player in game.players:
+            player.peek_card(player.decide_peek_initial())
+        grades = []
+        while not game.game_over:
+            seat = game.current_player
+            action = game.players[seat].act(game)
+            grades.append((seat, action, self.grade(game, action)))
+            game.apply(action)
+        return grades
+
+    # ---------- 整副牌求解 ----------
+
+    @staticmethod
+    def deal_state(rank):
+        """第 rank 种牌局发牌后的初始局面（玩家A先行动）"""
+        deck = [CARD_KIND[cid] for cid in unrank_deck(rank)]
+        # 与 Game.deal 相同：玩家A先从堆顶拿两张，再轮到玩家B
+        hand_a = tuple(sorted(KIND_NUMBERS[kind] for kind in deck[-2:]))
+        hand_b = tuple(sorted(KIND_NUMBERS[kind] for kind in deck[-4:-2]))
+        return (tuple(deck[:-4]), hand_a, hand_b, NO_CABO, -1)
+
+    def solve_deal(self, rank):
+        return self.value(self.deal_state(rank))
+
+    def solve_all(self, ranks=None):
+        """求解全部（或指定的）牌局，返回每局先手玩家视角的值"""
+        ranks = range(NUM_DEALS) if ranks is None else ranks
+        return [self.solve_deal(rank) for rank in ranks]
+
+
+if __name__ == "__main__":
+    solver = CaboSolver("cabo_solver_table.pkl")
+    start = time.time()
+    values = solver.solve_all()
+    print(f"求解 {len(values)} 种牌局用时 {time.time() - start:.1f} 秒，"
+          f"置换表 {len(solver.table)} 个局面")
+    print(f"先手玩家平均得分差: {sum(values) / len(values):.4f}")
+    solver.save()
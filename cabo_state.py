@@ -0,0 +1,200 @@
+from collections import namedtuple
+
+from game_cabo import Game, CARDS, HAND_SIZE, DRAW, CABO, DISCARD, REPLACE, PEEK, SWAP
+
+# 卡牌ID(0-9)对应的点数和技能
+CARD_NUMBERS = tuple(card.number for card in CARDS)
+CARD_SKILLS = tuple(card.skill for card in CARDS)
+NO_CARD = -1
+
+# 知识位域：每个位置占4位，0表示未知，否则为卡牌ID+1
+# 低8位是自己的两张牌，接下来8位是对手的两张牌
+SLOT_BITS = 4
+OPP_SHIFT = SLOT_BITS * HAND_SIZE
+# 两张牌都已知时，记录字典里第2张位置是否先于第1张被记住（影响按顺序遍历的AI决策）
+OWN_ORDER_BIT = 1 << (2 * OPP_SHIFT)
+OPP_ORDER_BIT = OWN_ORDER_BIT << 1
+
+# 整数编码的紧凑局面，可哈希，可与 Game 对象无损互转
+#   deck      牌堆的卡牌ID，最后一张是堆顶
+#   hands     每位玩家的手牌ID
+#   discard   弃牌堆，最后一张是堆顶
+#   knowledge 每位玩家的知识位域
+#   current   当前玩家下标
+#   caller    呼叫Cabo的玩家下标，没有则为-1
+#   drawn     已摸到、尚未处理的牌，没有则为-1
+#   over      游戏是否结束
+CompactState = namedtuple('CompactState', ('deck', 'hands', 'discard', 'knowledge',
+                                           'current', 'caller', 'drawn', 'over'))
+
+def known_card(state, player_idx, pos):
+    """玩家记住的自己第pos张牌的ID，未知返回-1"""
+    return ((state.knowledge[player_idx] >> (SLOT_BITS * pos)) & 0xF) - 1
+
+def known_opponent_card(state, player_idx, pos):
+    """玩家记住的对手第pos张牌的ID，未知返回-1"""
+    return ((state.knowledge[player_idx] >> (OPP_SHIFT + SLOT_BITS * pos)) & 0xF) - 1
+
+def hand_score(state, player_idx):
+    return sum(CARD_NUMBERS[cid] for cid in state.hands[player_idx])
+
+def _assign_ids(game):
+    """给局面里的每个Card对象分配卡牌ID（共享的CARDS直接使用其下标）"""
+    cards = [card for player in game.players for card in player.hand]
+    cards += game.deck + game.discard_pile
+    if game.drawn_card is not None:
+        cards.append(game.drawn_card)
+
+    interned = {id(card): cid for cid, card in enumerate(CARDS)}
+    ids = {}
+    used = set()
+    for card in cards:
+        cid = interned.get(id(card))
+        if cid is not None:
+            ids[id(card)] = cid
+            used.add(cid)
+    # 自行创建的Card对象按点数和技能匹配第一张未占用的ID
+    for card in cards:
+        if id(card) not in ids:
+            ids[id(card)] = _free_id(card, used)
+    return ids
+
+def _free_id(card, used):
+    for cid, interned in enumerate(CARDS):
+        if cid not in used and interned.number == card.number and interned.skill == card.skill:
+            used.add(cid)
+            return cid
+    raise ValueError(f"无法为卡牌 {card} 分配ID")
+
+def _encode_memory(memory, ids, shift):
+    bits = 0
+    for pos, card in memory.items():
+        cid = ids.get(id(card))
+        if cid is None:
+            cid = _free_id(card, set())
+        bits |= (cid + 1) << (shift + SLOT_BITS * pos)
+    return bits
+
+def from_game(game):
+    """把 Game 对象编码为 CompactState"""
+    if len(game.players) != 2 or game.hand_size != HAND_SIZE:
+        raise ValueError("紧凑局面只支持两人、每人两张牌的标准牌桌")
+    ids = _assign_ids(game)
+    knowledge = []
+    for player in game.players:
+        bits = _encode_memory(player.known_cards, ids, 0)
+        bits |= _encode_memory(player.known_opponent_cards, ids, OPP_SHIFT)
+        if list(player.known_cards)[:2] == [1, 0]:
+            bits |= OWN_ORDER_BIT
+        if list(player.known_opponent_cards)[:2] == [1, 0]:
+            bits |= OPP_ORDER_BIT
+        knowledge.append(bits)
+
+    return CompactState(
+        deck=tuple(ids[id(card)] for card in game.deck),
+        hands=tuple(tuple(ids[id(card)] for card in player.hand) for player in game.players),
+        discard=tuple(ids[id(card)] for card in game.discard_pile),
+        knowledge=tuple(knowledge),
+        current=game.current_player,
+        caller=game.players.index(game.cabo_caller) if game.cabo_called else NO_CARD,
+        drawn=ids[id(game.drawn_card)] if game.drawn_card is not None else NO_CARD,
+        over=game.game_over,
+    )
+
+def _decode_memory(bits, shift, reverse):
+    positions = range(HAND_SIZE - 1, -1, -1) if reverse else range(HAND_SIZE)
+    memory = {}
+    for pos in positions:
+        cid = ((bits >> (shift + SLOT_BITS * pos)) & 0xF) - 1
+        if cid != NO_CARD:
+            memory[pos] = CARDS[cid]
+    return memory
+
+def to_game(state, game=None):
+    """把 CompactState 还原到 Game 对象上（默认新建一个 Game，保留已有玩家对象）"""
+    if game is None:
+        game = Game()
+    game.deck = [CARDS[cid] for cid in state.deck]
+    game.discard_pile = [CARDS[cid] for cid in state.discard]
+    for player, hand, bits in zip(game.players, state.hands, state.knowledge):
+        player.hand = [CARDS[cid] for cid in hand]
+        player.known_cards = _decode_memory(bits, 0, bits & OWN_ORDER_BIT)
+        player.known_opponent_cards = _decode_memory(bits, OPP_SHIFT, bits & OPP_ORDER_BIT)
+    game.current_player = state.current
+    game.cabo_called = state.caller != NO_CARD
+    game.cabo_caller = game.players[state.caller] if game.cabo_called else None
+    game.drawn_card = CARDS[state.drawn] if state.drawn != NO_CARD else None
+    game.game_over = state.over
+    return game
+
+class SimTable:
+    """供搜索反复模拟的可变局面：只有卡牌ID，不记录玩家记忆
+
+    load 把局面复制进已分配好的列表，模拟过程中不会创建 Game/Player/Card 对象。
+    规则与 Game.apply 一致。
+    """
+    __slots__ = ('deck', 'hands', 'current', 'caller', 'drawn', 'over')
+
+    def __init__(self):
+        self.deck = []
+        self.hands = [[NO_CARD] * HAND_SIZE for _ in range(2)]
+        self.current = 0
+        self.caller = NO_CARD
+        self.drawn = NO_CARD
+        self.over = False
+
+    def load(self, deck, hands, current, caller, drawn, over=False):
+        self.deck[:] = deck
+        for hand, cards in zip(self.hands, hands):
+            hand[:] = cards
+        self.current = current
+        self.caller = caller
+        self.drawn = drawn
+        self.over = over
+
+    def legal_actions(self):
+        if self.over:
+            return []
+        drawn = self.drawn
+        if drawn == NO_CARD:
+            return [DRAW] if self.caller != NO_CARD else [DRAW, CABO]
+        skill = CARD_SKILLS[drawn]
+        if skill == 'Peek':
+            return _PEEK_ACTIONS
+        if skill == 'Swap':
+            return _SWAP_ACTIONS
+        return _REPLACE_ACTIONS
+
+    def apply(self, action):
+        if self.drawn == NO_CARD:
+            if action == DRAW:
+                self.drawn = self.deck.pop()
+                return
+            self.caller = self.current  # CABO
+        else:
+            if action >= SWAP:
+                my_pos, opp_pos = divmod(action - SWAP, HAND_SIZE)
+                mine, theirs = self.hands[self.current], self.hands[1 - self.current]
+                mine[my_pos], theirs[opp_pos] = theirs[opp_pos], mine[my_pos]
+            elif REPLACE <= action < PEEK:
+                self.hands[self.current][action - REPLACE] = self.drawn
+            # 弃牌和偷看不改变牌面
+            self.drawn = NO_CARD
+        # 牌堆耗尽，或者有人叫了Cabo且对手也完成了最后一回合，游戏结束
+        if not self.deck or (self.caller != NO_CARD and self.caller != self.current):
+            self.over = True
+        self.current = 1 - self.current
+
+    def final_scores(self):
+        scores = [sum(CARD_NUMBERS[cid] for cid in hand) for hand in self.hands]
+        if self.caller != NO_CARD:
+            caller = self.caller
+            if scores[caller] <= scores[1 - caller]:
+                scores[caller] = 0
+            else:
+                scores[caller] += 5
+        return scores
+
+_PEEK_ACTIONS = [DISCARD] + [PEEK + j for j in range(HAND_SIZE)]
+_SWAP_ACTIONS = [DISCARD] + [SWAP + i for i in range(HAND_SIZE * HAND_SIZE)]
+_REPLACE_ACTIONS = [DISCARD] + [REPLACE + i for i in range(HAND_SIZE)]
@@ -0,0 +1,173 @@
+import random
+from numbers import Integral
+from functools import lru_cache
+from math import factorial
+
+from game_cabo import Game, CARDS
+
+# 按点数和技能把10张牌分成6类：1-4各两张，Peek和Swap各一张
+KINDS = []
+for _card in CARDS:
+    if (_card.number, _card.skill) not in KINDS:
+        KINDS.append((_card.number, _card.skill))
+CARD_KIND = tuple(KINDS.index((card.number, card.skill)) for card in CARDS)
+KIND_COUNTS = tuple(CARD_KIND.count(kind) for kind in range(len(KINDS)))
+# 同类牌互换不改变牌局，所以不同的牌序共有 10!/(2!^4) = 226,800 种
+NUM_DEALS = factorial(len(CARDS))
+for _count in KIND_COUNTS:
+    NUM_DEALS //= factorial(_count)
+
+
+@lru_cache(maxsize=None)
+def _arrangements(counts):
+    """剩余各类牌数为 counts 时的不同排列数"""
+    total = factorial(sum(counts))
+    for count in counts:
+        total //= factorial(count)
+    return total
+
+
+def card_kind(card):
+    return KINDS.index((card.number, card.skill))
+
+
+def rank_deck(deck):
+    """把牌序（卡牌ID序列，或 Card 列表，最后一张是堆顶）映射为 0..NUM_DEALS-1 的整数"""
+    kinds = [CARD_KIND[card] if isinstance(card, Integral) else card_kind(card) for card in deck]
+    counts = list(KIND_COUNTS)
+    rank = 0
+    for kind in kinds:
+        # 先累加所有以更小类别开头的排列
+        for smaller in range(kind):
+            if counts[smaller]:
+                counts[smaller] -= 1
+                rank += _arrangements(tuple(counts))
+                counts[smaller] += 1
+        counts[kind] -= 1
+    return rank
+
+
+def unrank_deck(rank):
+    """rank_deck 的逆运算，返回卡牌ID列表；同类牌按ID从小到大依次出现"""
+    if not 0 <= rank < NUM_DEALS:
+        raise ValueError(f"牌局编号超出范围: {rank}")
+    counts = list(KIND_COUNTS)
+    kinds = []
+    for _ in range(len(CARDS)):
+        for kind in range(len(counts)):
+            if not counts[kind]:
+                continue
+            counts[kind] -= 1
+            block = _arrangements(tuple(counts))
+            if rank < block:
+                kinds.append(kind)
+                break
+            rank -= block
+            counts[kind] += 1
+    return _kinds_to_ids(kinds)
+
+
+def _kinds_to_ids(kinds):
+    next_id = {}
+    ids = []
+    for kind in kinds:
+        cid = next_id.get(kind, CARD_KIND.index(kind))
+        ids.append(cid)
+        next_id[kind] = cid + 1
+    return ids
+
+
+def deal_cards(rank):
+    """第 rank 种牌序对应的 Card 列表，可直接作为 Game 的牌堆"""
+    return [CARDS[cid] for cid in unrank_deck(rank)]
+
+
+def all_decks():
+    """按编号顺序列出全部牌序，形状为 (NUM_DEALS, 10) 的卡牌ID数组，可直接交给 BatchGame"""
+    import numpy as np  # 只有这里用到NumPy，锦标赛等只要 deal_cards 的进程不必加载它
+    decks = np.empty((NUM_DEALS, len(CARDS)), dtype=np.int8)
+    prefix = []
+    counts = list(KIND_COUNTS)
+    row = 0
+
+    def fill():
+        nonlocal row
+        if len(prefix) == len(CARDS):
+            decks[row] = _kinds_to_ids(prefix)
+            row += 1
+            return
+        for kind in range(len(counts)):
+            if counts[kind]:
+                counts[kind] -= 1
+                prefix.append(kind)
+                fill()
+                prefix.pop()
+                counts[kind] += 1
+
+    fill()
+    return decks
+
+
+def stratified_deals(per_stratum, seed=None):
+    """按开局发到两位玩家手里的4张牌分层抽样，返回 [(牌局编号, 权重), ...]
+
+    每层最多抽 per_stratum 局（不足则整层全取），权重为该层牌局数/抽样数，
+    加权平均即为全部牌局均值的无偏估计。
+    """
+    rng = random.Random(seed)
+    hand_cards = 2 * 2
+    deals = []
+    for top in _sequences(list(KIND_COUNTS), hand_cards):
+        counts = list(KIND_COUNTS)
+        for kind in top:
+            counts[kind] -= 1
+        rest = [kind for kind, count in enumerate(counts) for _ in range(count)]
+        size = _arrangements(tuple(counts))
+        if size <= per_stratum:
+            ranks = {rank_deck(_kinds_to_ids(order + top[::-1]))
+                     for order in _sequences(counts, len(rest))}
+        else:
+            ranks = set()
+            while len(ranks) < per_stratum:
+                rng.shuffle(rest)
+                ranks.add(rank_deck(_kinds_to_ids(rest + top[::-1])))
+        weight = size / len(ranks)
+        deals.extend((rank, weight) for rank in sorted(ranks))
+    return deals
+
+
+def _sequences(counts, length):
+    """从剩余的各类牌中取出 length 张的所有不同序列"""
+    if length == 0:
+        yield []
+        return
+    for kind in range(len(counts)):
+        if counts[kind]:
+            counts[kind] -= 1
+            for rest in _sequences(counts, length - 1):
+                yield [kind] + rest
+            counts[kind] += 1
+
+
+def play_deal(rank, make_players):
+    """用指定牌序让 make_players() 创建的玩家自动打完一局，返回最终得分"""
+    game = Game()
+    game.players = make_players()
+    game.reset_table(deal_cards(rank))
+    return game.run()
+
+
+def evaluate(make_players, deals=None):
+    """精确评估：在全部牌局（或 stratified_deals 的加权子集）上计算各座位的平均最终得分"""
+    if deals is None:
+        deals = ((rank, 1.0) for rank in range(NUM_DEALS))
+    totals = None
+    total_weight = 0.0
+    for rank, weight in deals:
+        scores = play_deal(rank, make_players)
+        if totals is None:
+            totals = [0.0] * len(scores)
+        for i, score in enumerate(scores):
+            totals[i] += weight * score
+        total_weight += weight
+    return [total / total_weight for total in totals]
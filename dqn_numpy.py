@@ -0,0 +1,368 @@
+import os
+import struct
+import sys
+from abc import ABCMeta, abstractmethod
+from collections import namedtuple
+
+import numpy as np
+
+from game_cabo import (Player, HAND_SIZE, DRAW, CABO, DISCARD, replace_action, peek_action,
+                       swap_action)
+
+LAYERS = (('fc1', 'ln1'), ('fc2', 'ln2'), ('fc3', 'ln3'))
+OUTPUT = 'fc4'
+LN_EPS = 1e-5  # 与 nn.LayerNorm 的默认值一致
+
+
+class NumpyDQN:
+    """只用NumPy的 DQN 前向传播，结果与 train_ai_player.DQN.forward 一致（float32）
+
+    hidden 是每个隐藏层的 (权重, 偏置, LayerNorm增益, LayerNorm偏置)，output 是输出层的
+    (权重, 偏置)；权重已转置成 (输入, 输出)。数组可以是只读的内存映射视图，不会被复制。
+    """
+
+    def __init__(self, hidden, output):
+        self.hidden = []
+        for weight, bias, gain, shift in hidden:
+            # 按行求平均用矩阵乘法代替 mean()：小数组上NumPy归约的固定开销比乘法还大
+            average = np.full((weight.shape[1], 1), 1.0 / weight.shape[1], dtype=np.float32)
+            self.hidden.append(((weight, bias), average, gain, shift))
+        self.output = tuple(output)
+        self.input_size = self.hidden[0][0][0].shape[0]
+        self.output_size = self.output[0].shape[1]
+
+    @classmethod
+    def from_state_dict(cls, params):
+        """params 是 state_dict 同名的数组（'fc1.weight'、'ln1.bias' 等）"""
+        def array(name):
+            return np.asarray(params[name], dtype=np.float32)
+
+        def linear(name):
+            return np.ascontiguousarray(array(f'{name}.weight').T), array(f'{name}.bias')
+
+        hidden = [(*linear(fc), array(f'{ln}.weight'), array(f'{ln}.bias')) for fc, ln in LAYERS]
+        return cls(hidden, linear(OUTPUT))
+
+    @classmethod
+    def load(cls, path):
+        """读取 .npz 或推理文件（.cabq，默认内存映射）"""
+        if path.endswith(ARTIFACT_SUFFIX):
+            return load_artifact(path)
+        with np.load(path) as params:
+            return cls.from_state_dict(params)
+
+    def forward(self, x):
+        """x 为单个状态 (13,) 或一批状态 (M, 13)；与 DQN.forward 一样总是返回 (M, 6)"""
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[None]
+        for (weight, bias), average, gain, shift in self.hidden:
+            x = x @ weight + bias
+            x = x - x @ average
+            var = (x * x) @ average
+            x = x / np.sqrt(var + LN_EPS) * gain + shift
+            np.maximum(x, 0, out=x)
+        weight, bias = self.output
+        return x @ weight + bias
+
+    __call__ = forward
+
+    def arrays(self):
+        """按推理文件中的顺序列出全部参数数组"""
+        for (weight, bias), _, gain, shift in self.hidden:
+            yield from (weight, bias, gain, shift)
+        yield from self.output
+
+
+# 推理文件：只有网络参数，不含优化器状态和 epsilon，可以内存映射后由多个进程共享
+#   文件头：魔数、版本号、状态维数、动作数、隐藏层个数，随后每个隐藏层宽度各两个字节
+#   数据区从 ARTIFACT_ALIGN 的整数倍开始，依次是每层的 float32 参数（权重已转置成 (输入, 输出)）
+ARTIFACT_MAGIC = b'CABQ'
+ARTIFACT_VERSION = 1
+ARTIFACT_HEADER = struct.Struct('<4sHHHH')
+ARTIFACT_ALIGN = 64
+ARTIFACT_SUFFIX = '.cabq'
+
+ArtifactHeader = namedtuple('ArtifactHeader', ('version', 'state_size', 'action_size', 'hidden_sizes'))
+
+
+def _layer_shapes(header):
+    sizes = (header.state_size, *header.hidden_sizes)
+    for n_in, n_out in zip(sizes, sizes[1:]):
+        yield from ((n_in, n_out), (n_out,), (n_out,), (n_out,))
+    yield from ((sizes[-1], header.action_size), (header.action_size,))
+
+
+def _data_offset(header):
+    size = ARTIFACT_HEADER.size + 2 * len(header.hidden_sizes)
+    return -(-size // ARTIFACT_ALIGN) * ARTIFACT_ALIGN
+
+
+def save_artifact(model, path):
+    """把 DQN（或其 state_dict，或 NumpyDQN）写成推理文件"""
+    if not isinstance(model, NumpyDQN):
+        state_dict = model.state_dict() if hasattr(model, 'state_dict') else model
+        model = NumpyDQN.from_state_dict({name: value.detach().cpu().numpy()
+                                          for name, value in state_dict.items()})
+    hidden_sizes = tuple(weight.shape[1] for (weight, _), _, _, _ in model.hidden)
+    header = ArtifactHeader(ARTIFACT_VERSION, model.input_size, model.output_size, hidden_sizes)
+    head = ARTIFACT_HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, model.input_size,
+                                model.output_size, len(hidden_sizes))
+    head += struct.pack(f'<{len(hidden_sizes)}H', *hidden_sizes)
+    with open(path, 'wb') as f:
+        f.write(head.ljust(_data_offset(header), b'\0'))
+        for array in model.arrays():
+            f.write(np.ascontiguousarray(array, dtype='<f4').tobytes())
+    return path
+
+
+def read_header(path):
+    """读取推理文件头，格式或版本不对时抛出 ValueError"""
+    with open(path, 'rb') as f:
+        head = f.read(ARTIFACT_HEADER.size)
+        if len(head) < ARTIFACT_HEADER.size or head[:len(ARTIFACT_MAGIC)] != ARTIFACT_MAGIC:
+            raise ValueError(f"不是推理文件: {path}")
+        _, version, state_size, action_size, num_hidden = ARTIFACT_HEADER.unpack(head)
+        if version != ARTIFACT_VERSION:
+            raise ValueError(f"不支持的推理文件版本: {version}")
+        hidden_sizes = struct.unpack(f'<{num_hidden}H', f.read(2 * num_hidden))
+    return ArtifactHeader(version, state_size, action_size, hidden_sizes)
+
+
+def load_artifact(path, mmap=True):
+    """读取推理文件；mmap 时参数是只读的内存映射视图，同一文件在各进程间共享物理内存"""
+    header = read_header(path)
+    shapes = list(_layer_shapes(header))
+    count = sum(int(np.prod(shape)) for shape in shapes)
+    offset = _data_offset(header)
+    if os.path.getsize(path) != offset + 4 * count:
+        raise ValueError(f"推理文件大小与文件头描述的网络结构不一致: {path}")
+    if mmap:
+        # 转成普通数组视图（仍引用映射），避免每次运算都经过 memmap 子类
+        data = np.memmap(path, dtype='<f4', mode='r', offset=offset, shape=(count,)).view(np.ndarray)
+    else:
+        data = np.fromfile(path, dtype='<f4', offset=offset)
+    arrays = []
+    for shape in shapes:
+        size = int(np.prod(shape))
+        arrays.append(data[:size].reshape(shape))
+        data = data[size:]
+    hidden = [arrays[i:i + 4] for i in range(0, len(arrays) - 2, 4)]
+    return NumpyDQN(hidden, arrays[-2:])
+
+
+def export_npz(model, path):
+    """把 DQN（或其 state_dict）的参数写成平铺的 .npz"""
+    state_dict = model.state_dict() if hasattr(model, 'state_dict') else model
+    np.savez(path, **{name: value.detach().cpu().numpy() for name, value in state_dict.items()})
+    return path
+
+
+def export_checkpoint(model_path, path=None):
+    """把 CaboAIPlayer.save_model 保存的训练检查点导出为推理文件（path 以 .npz 结尾时导出 .npz）
+
+    默认写到同名的 .cabq；只有这里需要torch。
+    """
+    import torch
+    checkpoint = torch.load(model_path, map_location='cpu')
+    path = path or export_path(model_path)
+    if path.endswith('.npz'):
+        return export_npz(checkpoint['model_state_dict'], path)
+    return save_artifact(checkpoint['model_state_dict'], path)
+
+
+def export_path(model_path, suffix=ARTIFACT_SUFFIX):
+    """与训练检查点同名的导出文件路径"""
+    return os.path.splitext(model_path)[0] + suffix
+
+
+def npz_path(model_path):
+    """与训练检查点同名的 .npz 路径"""
+    return export_path(model_path, '.npz')
+
+
+def fresh_export(model_path):
+    """model_path 本身是导出文件，或者同名的推理文件/.npz（按此优先顺序）不比检查点旧时
+    返回它的路径，否则返回 None"""
+    if model_path.endswith((ARTIFACT_SUFFIX, '.npz')):
+        return model_path if os.path.exists(model_path) else None
+    for suffix in (ARTIFACT_SUFFIX, '.npz'):
+        path = export_path(model_path, suffix)
+        if not os.path.exists(path):
+            continue
+        if os.path.exists(model_path) and os.path.getmtime(path) < os.path.getmtime(model_path):
+            continue
+        return path
+    return None
+
+
+def greedy_player(name, model_path, rng=None):
+    """对局用的贪心DQN玩家：有最新的导出文件时只用NumPy推理，否则用torch加载检查点里的网络参数"""
+    path = fresh_export(model_path)
+    if path is not None:
+        return NumpyDQNPlayer(name, rng, path)
+    from train_ai_player import CaboAIPlayer
+    player = CaboAIPlayer(name, rng)
+    player.load_model(model_path, weights_only=True)
+    player.epsilon = 0
+    return player
+
+
+class QPlayer(Player, metaclass=ABCMeta):
+    """按Q值选动作的DQN玩家的共用部分：状态编码和动作翻译
+
+    子类实现 q_values(states)，对 (M, state_size) 的状态返回 (M, action_size) 的Q值。
+    状态编码是定长的，只支持两人、每人两张手牌的标准牌桌。
+    """
+    state_size = 13
+    action_size = 6
+
+    def __init__(self, name, rng=None):
+        super().__init__(name, rng)
+        self.epsilon = 0.0
+        self.pending_action = None  # 回合开始时选定、摸牌后执行的动作
+
+    @abstractmethod
+    def q_values(self, states):
+        """对 (M, state_size) 的状态返回 (M, action_size) 的Q值"""
+
+    def decode_action(self, action_idx):
+        """将动作索引解码为具体操作"""
+        if action_idx == 0:
+            return "cabo"
+        elif action_idx == 1:
+            return "peek"
+        elif action_idx == 2:
+            return "swap"
+        elif action_idx == 3:
+            return "swap_pos_1"
+        elif action_idx == 4:
+            return "swap_pos_2"
+        else:
+            return "discard"
+
+    def encode_state(self, game_state, out=None):
+        """改进状态编码，添加更多信息（给出 out 时写入这一行，不新建数组）"""
+        if game_state.hand_size != HAND_SIZE or len(game_state.players) != 2:
+            raise ValueError(f"DQN 的状态编码只支持两人、每人 {HAND_SIZE} 张手牌的牌桌")
+        state = []
+        # 编码自己已知的牌
+        known_sum = 0
+        known_count = 0
+        for i in range(HAND_SIZE):
+            if i in self.known_cards:
+                card = self.known_cards[i]
+                state.extend([card.number / 5, 1])
+                known_sum += card.number
+                known_count += 1
+            else:
+                state.extend([0, 0])
+
+        # 添加平均分信息
+        avg_score = known_sum / max(1, known_count)
+        state.append(avg_score / 5)
+
+        # 编码对手已知的牌
+        opp_known_sum = 0
+        opp_known_count = 0
+        for i in range(HAND_SIZE):
+            if i in self.known_opponent_cards:
+                card = self.known_opponent_cards[i]
+                state.extend([card.number / 5, 1])
+                opp_known_sum += card.number
+                opp_known_count += 1
+            else:
+                state.extend([0, 0])
+
+        # 添加对手平均分信息
+        opp_avg_score = opp_known_sum / max(1, opp_known_count)
+        state.append(opp_avg_score / 5)
+
+        # 编码牌堆和游戏状态信息
+        state.extend([
+            len(game_state.deck) / 10,  # 牌堆剩余比例
+            1 if game_state.cabo_called else 0,
+            1 if game_state.cabo_caller == self else 0
+        ])
+
+        if out is not None:
+            out[:] = state
+            return out
+        return np.array(state, dtype=np.float32)
+
+    def choose_action(self, state):
+        """选择动作（epsilon-greedy策略）"""
+        if self.rng.random() < self.epsilon:
+            return self.rng.randrange(self.action_size)
+        return int(np.asarray(self.q_values(state))[0].argmax())
+
+    def choose_actions(self, states):
+        """为一批状态 (M, state_size) 一次前向传播选出 M 个动作（逐行 epsilon-greedy）"""
+        return self.epsilon_greedy(self.q_values(states))
+
+    def epsilon_greedy(self, q_values, rows=None):
+        """按Q值取最优动作，rows（默认全部）中的每一行以 epsilon 的概率换成随机动作"""
+        actions = np.asarray(q_values).argmax(axis=1)
+        for i in range(len(actions)) if rows is None else rows:
+            if self.rng.random() < self.epsilon:
+                actions[i] = self.rng.randrange(self.action_size)
+        return actions
+
+    def decide_peek_initial(self):
+        """决定初始要看哪张牌"""
+        # 随机选择一张未知的牌
+        unknown_positions = [i for i in range(len(self.hand)) if i not in self.known_cards]
+        return self.rng.choice(unknown_positions)
+
+    def act(self, game):
+        """把DQN选出的动作翻译成引擎动作（用于对局，训练使用 CaboEnv.step）"""
+        drawn_card = game.drawn_card
+        if drawn_card is None:
+            state = self.encode_state(game)
+            self.pending_action = self.decode_action(self.choose_action(state))
+            if self.pending_action == "cabo" and not game.cabo_called:
+                return CABO
+            return DRAW
+
+        action_type = self.pending_action
+        if drawn_card.skill == "Peek" and action_type == "peek":
+            unknown_positions = [i for i in range(game.hand_size) if i not in self.known_opponent_cards]
+            if unknown_positions:
+                return peek_action(self.rng.choice(unknown_positions))
+        elif drawn_card.skill == "Swap" and action_type == "swap":
+            swap_pos = self.choose_swap_positions()
+            if swap_pos:
+                return swap_action(*swap_pos)
+        elif not drawn_card.skill and action_type.startswith("swap_pos"):
+            return replace_action(int(action_type[-1]) - 1)
+        return DISCARD
+
+    def choose_swap_positions(self):
+        """用已知最大的牌交换对手已知最小的牌"""
+        my_max_card = max(((i, card) for i, card in self.known_cards.items()),
+                          key=lambda x: x[1].number, default=(None, None))
+        opp_min_card = min(((i, card) for i, card in self.known_opponent_cards.items()),
+                           key=lambda x: x[1].number, default=(None, None))
+        if my_max_card[0] is None or opp_min_card[0] is None:
+            return None
+        return my_max_card[0], opp_min_card[0]
+
+
+class NumpyDQNPlayer(QPlayer):
+    """用导出的权重（推理文件或 .npz）和NumPy前向传播对局的贪心DQN玩家，不需要torch"""
+
+    def __init__(self, name, rng=None, model=None):
+        super().__init__(name, rng)
+        self.model = NumpyDQN.load(model) if isinstance(model, str) else model
+        if (self.model.input_size, self.model.output_size) != (self.state_size, self.action_size):
+            raise ValueError(f"网络输入输出为 {self.model.input_size}/{self.model.output_size}，"
+                             f"玩家需要 {self.state_size}/{self.action_size}")
+
+    def q_values(self, states):
+        return self.model(states)
+
+
+if __name__ == "__main__":
+    # python dqn_numpy.py [检查点.pth ...]：导出同名的推理文件 .cabq
+    for model_path in sys.argv[1:] or ["cabo_ai_model.pth"]:
+        print(f"{model_path} -> {export_checkpoint(model_path)}")
@@ -0,0 +1,285 @@
+from collections import OrderedDict
+
+from game_cabo import Player, DRAW, CABO
+from belief import BeliefTracker, UNKNOWN
+
+# 局面里记录Cabo状态（以自己为视角）
+NO_CABO = 0
+I_CALLED = 1
+THEY_CALLED = 2
+
+UNSEEN = -1  # 手牌里自己不知道点数的位置
+
+
+def _take(unseen, kind):
+    return unseen[:kind] + (unseen[kind] - 1,) + unseen[kind + 1:]
+
+
+def _set(hand, pos, value):
+    return hand[:pos] + (value,) + hand[pos + 1:]
+
+
+def _chances(unseen, total=None, exclude=None):
+    """从没见过的牌里抽一张：产出 (类别, 概率)；exclude 是已经被取走、但仍计在 unseen 里的一张"""
+    total = sum(unseen) if total is None else total
+    if exclude is not None:
+        total -= 1
+    for kind, count in enumerate(unseen):
+        if kind == exclude:
+            count -= 1
+        if count > 0:
+            yield kind, count / total
+
+
+class ExpectimaxSearch:
+    """以信息集为节点的有限深度期望最大搜索
+
+    局面只包含自己能知道的信息：双方手牌里已知的点数（未知记为-1）、没见过的各类牌张数、
+    牌堆剩余张数和Cabo状态。未知的牌彼此可交换，所以抽牌、翻开手牌、偷看都是对
+    "没见过的牌"这个多重集合的精确枚举，不做采样。
+
+    对手的回合按固定模型展开：摸到的数字牌小于对手（在自己看来）期望最大的那张就替换它，
+    否则弃掉；技能牌直接弃掉；对手不主动叫Cabo。depth 是向前看的自己回合数，
+    到达深度时取"现在叫Cabo"和按期望点数估计的较大值。
+    值为自己视角的最终得分差（对手得分 - 自己得分），用 LRU 缓存按规范化局面记忆。
+    """
+
+    def __init__(self, numbers, skills, depth=2, cache_size=200000):
+        self.numbers = tuple(numbers)
+        self.skills = tuple(skills)
+        self.depth = depth
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def _cached(self, key, compute, *args):
+        cache = self.cache
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+            return value
+        value = compute(*args)
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    # ---------- 节点 ----------
+
+    def turn_start(self, mine, theirs, unseen, deck, cabo, depth):
+        """自己回合开始（摸牌或叫Cabo）"""
+        key = ('start', mine, theirs, unseen, deck, cabo, depth)
+        return self._cached(key, self._turn_start, mine, theirs, unseen, deck, cabo, depth)
+
+    def _turn_start(self, mine, theirs, unseen, deck, cabo, depth):
+        if depth <= 0 and cabo == NO_CABO:
+            return max(self.static_value(mine, theirs, unseen), self.call_value(mine, theirs, unseen, deck))
+        best = self.draw_value(mine, theirs, unseen, deck, cabo, depth)
+        if cabo == NO_CABO:
+            best = max(best, self.call_value(mine, theirs, unseen, deck))
+        return best
+
+    def call_value(self, mine, theirs, unseen, deck):
+        # 叫Cabo后对手还有最后一个回合
+        return self.opponent_turn(mine, theirs, unseen, deck, I_CALLED, 0)
+
+    def draw_value(self, mine, theirs, unseen, deck, cabo, depth):
+        total = sum(unseen)
+        return sum(p * self.after_draw(mine, theirs, _take(unseen, kind), deck - 1, cabo, kind, depth)
+                   for kind, p in _chances(unseen, total))
+
+    def after_draw(self, mine, theirs, unseen, deck, cabo, drawn, depth):
+        """摸到 drawn 类的牌之后，在所有处理方式中取最好的"""
+        key = ('drawn', mine, theirs, unseen, deck, cabo, drawn, depth)
+        return self._cached(key, self._after_draw, mine, theirs, unseen, deck, cabo, drawn, depth)
+
+    def _after_draw(self, mine, theirs, unseen, deck, cabo, drawn, depth):
+        best = None
+        for outcomes in self.options(mine, theirs, unseen, drawn):
+            value = sum(p * self.end_turn(m, t, u, deck, cabo, depth) for p, m, t, u in outcomes)
+            if best is None or value > best:
+                best = value
+        return best
+
+    def options(self, mine, theirs, unseen, drawn):
+        """摸到 drawn 后每种不同的处理方式，各自产出结果分布 [(概率, 自己, 对手, 没见过的牌)]"""
+        yield [(1.0, mine, theirs, unseen)]  # 弃牌
+        skill = self.skills[drawn]
+        if skill == 'Peek':
+            if UNSEEN in theirs:
+                yield self.outcome((), (theirs.index(UNSEEN),), mine, theirs, unseen, None)
+        elif skill == 'Swap':
+            for i in range(len(mine)):
+                if i and mine[i] == mine[i - 1]:
+                    continue
+                for j in range(len(theirs)):
+                    if j and theirs[j] == theirs[j - 1]:
+                        continue
+                    yield [(1.0, tuple(sorted(_set(mine, i, theirs[j]))),
+                            tuple(sorted(_set(theirs, j, mine[i]))), unseen)]
+        else:
+            for i in range(len(mine)):
+                if not (i and mine[i] == mine[i - 1]):
+                    yield self.outcome((i,), (), mine, theirs, unseen, self.numbers[drawn])
+
+    def outcome(self, replace, peek, mine, theirs, unseen, number):
+        """用 number 换掉自己的第 replace 张，或偷看对手的第 peek 张，返回结果分布
+
+        换掉或偷看的牌若原本未知，就按没见过的牌精确展开。
+        """
+        if replace:
+            pos = replace[0]
+            if mine[pos] != UNSEEN:
+                return [(1.0, tuple(sorted(_set(mine, pos, number))), theirs, unseen)]
+            return [(p, tuple(sorted(_set(mine, pos, number))), theirs, _take(unseen, kind))
+                    for kind, p in _chances(unseen)]
+        pos = peek[0]
+        return [(p, mine, tuple(sorted(_set(theirs, pos, self.numbers[kind]))), _take(unseen, kind))
+                for kind, p in _chances(unseen)]
+
+    def end_turn(self, mine, theirs, unseen, deck, cabo, depth):
+        # 牌堆耗尽，或者对手叫了Cabo而自己完成了最后一回合，游戏结束
+        if deck == 0 or cabo == THEY_CALLED:
+            return self.terminal(mine, theirs, unseen, cabo)
+        return self.opponent_turn(mine, theirs, unseen, deck, cabo, depth - 1)
+
+    def opponent_turn(self, mine, theirs, unseen, deck, cabo, depth):
+        key = ('opp', mine, theirs, unseen, deck, cabo, depth)
+        return self._cached(key, self._opponent_turn, mine, theirs, unseen, deck, cabo, depth)
+
+    def _opponent_turn(self, mine, theirs, unseen, deck, cabo, depth):
+        total = sum(unseen)
+        mean = self.unseen_mean(unseen)
+        expected = [mean if value == UNSEEN else value for value in theirs]
+        worst = max(range(len(theirs)), key=expected.__getitem__)
+        value = 0.0
+        for kind, p in _chances(unseen, total):
+            if self.skills[kind] is None and self.numbers[kind] < expected[worst]:
+                # 替换掉期望最大的那张：换下的牌翻开，换上的牌对自己仍是未知的
+                hand = tuple(sorted(_set(theirs, worst, UNSEEN)))
+                if theirs[worst] != UNSEEN:
+                    outcomes = [(1.0, unseen)]
+                else:
+                    outcomes = [(q, _take(unseen, old)) for old, q in _chances(unseen, total, kind)]
+            else:
+                hand = theirs
+                outcomes = [(1.0, _take(unseen, kind))]
+            for q, rest in outcomes:
+                value += p * q * self._after_opponent(mine, hand, rest, deck - 1, cabo, depth)
+        return value
+
+    def _after_opponent(self, mine, theirs, unseen, deck, cabo, depth):
+        if deck == 0 or cabo == I_CALLED:
+            return self.terminal(mine, theirs, unseen, cabo)
+        return self.turn_start(mine, theirs, unseen, deck, cabo, depth)
+
+    # ---------- 估值 ----------
+
+    def unseen_mean(self, unseen):
+        total = sum(unseen)
+        if not total:
+            return 0.0
+        return sum(n * c for n, c in zip(self.numbers, unseen)) / total
+
+    def static_value(self, mine, theirs, unseen):
+        """不叫Cabo时按期望点数估计的得分差"""
+        mean = self.unseen_mean(unseen)
+        return (sum(mean if v == UNSEEN else v for v in theirs)
+                - sum(mean if v == UNSEEN else v for v in mine))
+
+    def terminal(self, mine, theirs, unseen, cabo):
+        """终局的精确期望得分差：所有未知的手牌按没见过的牌无放回地精确展开"""
+        key = ('end', mine, theirs, unseen, cabo)
+        return self._cached(key, self._terminal, mine, theirs, unseen, cabo)
+
+    def _terminal(self, mine, theirs, unseen, cabo):
+        if UNSEEN in mine:
+            pos = mine.index(UNSEEN)
+            return sum(p * self.terminal(tuple(sorted(_set(mine, pos, self.numbers[kind]))), theirs,
+                                         _take(unseen, kind), cabo)
+                       for kind, p in _chances(unseen))
+        if UNSEEN in theirs:
+            pos = theirs.index(UNSEEN)
+            return sum(p * self.terminal(mine, tuple(sorted(_set(theirs, pos, self.numbers[kind]))),
+                                         _take(unseen, kind), cabo)
+                       for kind, p in _chances(unseen))
+        my_score, their_score = sum(mine), sum(theirs)
+        # 叫Cabo的玩家分数最低得0分，否则加5分罚分
+        if cabo == I_CALLED:
+            my_score = 0 if my_score <= their_score else my_score + 5
+        elif cabo == THEY_CALLED:
+            their_score = 0 if their_score <= my_score else their_score + 5
+        return their_score - my_score
+
+
+class ExpectimaxPlayer(Player):
+    """用 ExpectimaxSearch 精确计算每个合法动作的期望得分差，选最大的（只支持两人牌桌）
+
+    自带一个 BeliefTracker 追踪没见过的牌，第一次行动时挂到牌局上。
+    """
+
+    def __init__(self, name, rng=None, depth=2, cache_size=200000):
+        super().__init__(name, rng)
+        self.depth = depth
+        self.cache_size = cache_size
+        self.search = None
+        self.belief = None
+        self._game = None
+
+    def _track(self, game):
+        if self._game is game and self.belief.seat == game.current_player:
+            return
+        if len(game.players) != 2:
+            raise ValueError("ExpectimaxPlayer 只支持两人牌桌")
+        self.belief = BeliefTracker.for_game(game, game.current_player)
+        self.belief.sync(game)
+        game.add_observer(self.belief)
+        self._game = game
+        numbers = [number for number, _ in self.belief.kinds]
+        skills = [skill for _, skill in self.belief.kinds]
+        if self.search is None or self.search.numbers != tuple(numbers) or self.search.skills != tuple(skills):
+            self.search = ExpectimaxSearch(numbers, skills, self.depth, self.cache_size)
+
+    def action_values(self, game):
+        """当前每个合法动作的期望得分差（对手得分 - 自己得分）"""
+        self._track(game)
+        belief, search = self.belief, self.search
+        seat = belief.seat
+        numbers = search.numbers
+        mine = tuple(UNSEEN if kind == UNKNOWN else numbers[kind] for kind in belief.slots[seat])
+        theirs = tuple(UNSEEN if kind == UNKNOWN else numbers[kind] for kind in belief.slots[1 - seat])
+        unseen = tuple(belief.unseen)
+        deck = len(game.deck)
+        if not game.cabo_called:
+            cabo = NO_CABO
+        else:
+            cabo = I_CALLED if game.cabo_caller is self else THEY_CALLED
+        sorted_mine, sorted_theirs = tuple(sorted(mine)), tuple(sorted(theirs))
+
+        values = {}
+        for action in game.legal_actions():
+            if action == DRAW:
+                values[action] = search.draw_value(sorted_mine, sorted_theirs, unseen, deck, cabo,
+                                                   search.depth)
+                continue
+            if action == CABO:
+                values[action] = search.call_value(sorted_mine, sorted_theirs, unseen, deck)
+                continue
+            kind, *args = game.unpack(action)
+            if kind == "replace":
+                outcomes = search.outcome(args, (), mine, theirs, unseen,
+                                          numbers[belief.drawn])
+            elif kind == "peek" and theirs[args[0]] == UNSEEN:
+                outcomes = search.outcome((), args, mine, theirs, unseen, None)
+            elif kind == "swap":
+                i, j = args
+                outcomes = [(1.0, _set(mine, i, theirs[j]), _set(theirs, j, mine[i]), unseen)]
+            else:
+                outcomes = [(1.0, mine, theirs, unseen)]
+            values[action] = sum(p * search.end_turn(tuple(sorted(m)), tuple(sorted(t)), u, deck,
+                                                     cabo, search.depth)
+                                 for p, m, t, u in outcomes)
+        return values
+
+    def act(self, game):
+        values = self.action_values(game)
+        return max(values, key=values.get)
@@ -1,7 +1,75 @@
+import hashlib
 import random
 import os
 
+HAND_SIZE = 2  # 每位玩家的手牌数
+
+# 规则引擎的动作编码
+DRAW = 0      # 摸牌
+CABO = 1      # 呼叫Cabo
+DISCARD = 2   # 弃掉摸到的牌（技能牌即不使用技能）
+REPLACE = 3   # 用摸到的牌替换自己的第i张牌
+PEEK = REPLACE + HAND_SIZE  # 偷看对手的第j张牌
+SWAP = PEEK + HAND_SIZE     # 用自己的第i张牌交换对手的第j张牌
+NUM_ACTIONS = SWAP + HAND_SIZE * HAND_SIZE
+
+# 多人或多张手牌的牌桌：对手的牌按座次从下家开始展开编号，
+# 第 o 个下家（o从1开始）的第j张牌记为 (o-1)*手牌数 + j，两人两张牌时即为对手的第j张牌
+def replace_action(pos):
+    return REPLACE + pos
+
+def peek_action(opp_pos, hand_size=HAND_SIZE):
+    return REPLACE + hand_size + opp_pos
+
+def swap_action(my_pos, opp_pos, hand_size=HAND_SIZE, num_players=2):
+    opp_slots = (num_players - 1) * hand_size
+    return REPLACE + hand_size + opp_slots * (1 + my_pos) + opp_pos
+
+def num_actions(hand_size=HAND_SIZE, num_players=2):
+    opp_slots = (num_players - 1) * hand_size
+    return REPLACE + hand_size + opp_slots * (1 + hand_size)
+
+def unpack_action(action, hand_size=HAND_SIZE, num_players=2):
+    """把动作编码还原为 (类型, 参数...)"""
+    if action == DRAW:
+        return ("draw",)
+    if action == CABO:
+        return ("cabo",)
+    if action == DISCARD:
+        return ("discard",)
+    peek = REPLACE + hand_size
+    opp_slots = (num_players - 1) * hand_size
+    swap = peek + opp_slots
+    if REPLACE <= action < peek:
+        return ("replace", action - REPLACE)
+    if peek <= action < swap:
+        return ("peek", action - peek)
+    if swap <= action < swap + hand_size * opp_slots:
+        return ("swap",) + divmod(action - swap, opp_slots)
+    raise ValueError(f"未知动作: {action}")
+
+def make_rng(rng=None):
+    """随机数来源：None 使用全局 random 模块，整数作为种子新建 random.Random，其余原样使用"""
+    if rng is None:
+        return random
+    if isinstance(rng, int):
+        return random.Random(rng)
+    return rng
+
+def split_seed(seed, index):
+    """由主种子派生第 index 个子种子，用于给并行的进程或对局分配互相独立、可复现的随机数"""
+    digest = hashlib.sha256(f"{seed}/{index}".encode()).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+# 撤销日志里的记录类型，每个动作以 None 开头
+_UNDO_ATTR = 0  # (类型, 对象, 属性名, 旧值)
+_UNDO_SLOT = 1  # (类型, 列表, 下标, 旧值)
+_UNDO_PUSH = 2  # (类型, 列表)：撤销时弹出末尾
+_UNDO_POP = 3   # (类型, 列表, 值)：撤销时放回末尾
+
 class Card:
+    __slots__ = ('number', 'skill')
+
     def __init__(self, number, skill=None):
         self.number = number
         self.skill = skill  # 'Peek' 或 'Swap'
@@ -9,14 +77,59 @@ class Card:
     def __str__(self):
         return f"{self.number}{'(' + self.skill + ')' if self.skill else ''}"
 
+    def __reduce__(self):
+        # 共享的卡牌在序列化（例如传给子进程）后仍还原为 CARDS 中的同一对象
+        for cid, card in enumerate(CARDS):
+            if card is self:
+                return (interned_card, (cid,))
+        return (Card, (self.number, self.skill))
+
+def interned_card(cid):
+    return CARDS[cid]
+
+SKILL_NUMBER = 5  # 技能牌的点数
+
+# 整副牌只有10张且牌本身不可变，所有对局共用同一组Card对象，下标即卡牌ID(0-9)
+CARDS = tuple(
+    [Card(num) for num in range(1, 5) for _ in range(2)]  # 1-4的数字牌各两张
+    + [Card(SKILL_NUMBER, 'Peek'), Card(SKILL_NUMBER, 'Swap')]  # 特殊的5号牌（技能牌）
+)
+
+def make_cards(number_counts, peek=1, swap=1):
+    """自定义牌组：number_counts 为 {点数: 张数}，另加 peek/swap 张技能牌
+
+    与标准牌组相同的部分直接复用 CARDS 里的共享对象。
+    """
+    wanted = [(number, None) for number, count in sorted(number_counts.items())
+              for _ in range(count)]
+    wanted += [(SKILL_NUMBER, 'Peek')] * peek + [(SKILL_NUMBER, 'Swap')] * swap
+    spare = list(CARDS)
+    cards = []
+    for number, skill in wanted:
+        for i, card in enumerate(spare):
+            if card.number == number and card.skill == skill:
+                cards.append(spare.pop(i))
+                break
+        else:
+            cards.append(Card(number, skill))
+    return tuple(cards)
+
 class Player:
-    def __init__(self, name):
+    def __init__(self, name, rng=None):
         self.name = name
+        self.rng = make_rng(rng)  # 开局偷看等随机选择使用的随机数来源
         self.hand = []
         self.known_cards = {}  # 记录自己已知的牌
         self.known_opponent_cards = {}  # 记录已知的对手牌
         self.called_cabo = False
 
+    def reset(self):
+        """清空手牌和记忆，准备新的一局"""
+        self.hand = []
+        self.known_cards = {}
+        self.known_opponent_cards = {}
+        self.called_cabo = False
+
     def peek_card(self, position):
         if 0 <= position < len(self.hand):
             self.known_cards[position] = self.hand[position]
@@ -27,6 +140,16 @@ class Player:
         self.known_opponent_cards[position] = opponent_card
         return opponent_card
 
+    def decide_peek_initial(self):
+        """决定初始要看哪张牌"""
+        # 随机选择一张未知的牌
+        unknown_positions = [i for i in range(len(self.hand)) if i not in self.known_cards]
+        return self.rng.choice(unknown_positions)
+
+    def act(self, game):
+        """根据当前局面返回一个合法的引擎动作，由各类AI玩家实现"""
+        raise NotImplementedError
+
     def show_hand(self, reveal_all=False):
         cards = []
         for i, card in enumerate(self.hand):
@@ -43,68 +166,326 @@ class Player:
     def total_score(self):
         return sum(card.number for card in self.hand)
 
+class Observers:
+    """把牌局事件依次转发给多个观察者"""
+
+    def __init__(self, *observers):
+        self.observers = list(observers)
+
+    def on_deal(self, game):
+        for observer in self.observers:
+            observer.on_deal(game)
+
+    def on_move(self, game, action):
+        for observer in self.observers:
+            observer.on_move(game, action)
+
+    def on_end(self, game):
+        for observer in self.observers:
+            observer.on_end(game)
+
 class Game:
-    def __init__(self):
-        self.deck = self.create_deck()
-        self.players = [Player("玩家A"), Player("玩家B")]
+    single_seat = False  # 训练环境里每步不切换玩家（对局记录据此决定回放时是否结束回合）
+
+    def __init__(self, num_players=2, hand_size=HAND_SIZE, cards=CARDS, rng=None):
+        if len(cards) <= num_players * hand_size:
+            raise ValueError(f"{len(cards)} 张牌不够 {num_players} 位玩家各发 {hand_size} 张")
+        self.rng = make_rng(rng)  # 洗牌使用的随机数来源（可传入种子以便复现）
+        self.players = [Player(f"玩家{chr(ord('A') + i)}", self.rng) for i in range(num_players)]
+        self.hand_size = hand_size
+        self.cards = tuple(cards)
+        self.undo_log = None  # 调用 enable_undo 后记录每个动作修改过的位置
+        self.observer = None  # 对局观察者（记录器、信念追踪等），在发牌、每个动作和终局时收到通知
+        self._build_actions(num_players)
+        self.reset_table()
+
+    def _build_actions(self, num_players):
+        # 合法动作列表只取决于摸到的牌的类型，建桌时生成一次，之后每回合直接返回
+        k = self.hand_size
+        self.opponent_slots = (num_players - 1) * k
+        self._peek = REPLACE + k
+        self._swap = self._peek + self.opponent_slots
+        self._start_actions = [DRAW, CABO]
+        self._last_round_actions = [DRAW]
+        self._replace_actions = [DISCARD] + [REPLACE + i for i in range(k)]
+        self._peek_actions = [DISCARD] + [self._peek + t for t in range(self.opponent_slots)]
+        self._swap_actions = [DISCARD] + [self._swap + i for i in range(k * self.opponent_slots)]
+
+    def opponent_slot(self, seat, opp_seat, pos):
+        """opp_seat 的第 pos 张牌在 seat 视角下的对手位置编号"""
+        return ((opp_seat - seat) % len(self.players) - 1) * self.hand_size + pos
+
+    def slot_owner(self, seat, slot):
+        """opponent_slot 的逆运算，返回 (对手座位, 手牌位置)"""
+        offset, pos = divmod(slot, self.hand_size)
+        return (seat + 1 + offset) % len(self.players), pos
+
+    def unpack(self, action):
+        """按本桌的人数和手牌数还原动作编码"""
+        return unpack_action(action, self.hand_size, len(self.players))
+
+    def add_observer(self, observer):
+        """挂上一个观察者，需实现 on_deal(game)、on_move(game, action)（动作执行前）和 on_end(game)"""
+        if self.observer is None:
+            self.observer = observer
+        elif isinstance(self.observer, Observers):
+            self.observer.observers.append(observer)
+        else:
+            self.observer = Observers(self.observer, observer)
+        return observer
+
+    def reset_table(self, deck=None):
+        """洗牌（或使用指定的牌序）并清空牌桌与玩家状态，准备开始新的一局"""
+        self.deck = list(deck) if deck is not None else self.create_deck()
         self.discard_pile = []
         self.current_player = 0
         self.cabo_called = False
         self.cabo_caller = None
+        self.drawn_card = None  # 当前玩家已摸到、尚未处理的牌
+        self.game_over = False
+        if self.undo_log is not None:
+            self.undo_log = []
+        for player in self.players:
+            player.reset()
 
     def clear_screen(self):
         os.system('cls' if os.name == 'nt' else 'clear')
 
     def create_deck(self):
-        deck = []
-        # 添加数字牌 (1-5各两张)
-        for num in range(1, 5):  # 1-4的数字牌
-            for _ in range(2):
-                deck.append(Card(num))
-        # 添加特殊的5号牌（技能牌）
-        deck.append(Card(5, 'Peek'))  # 偷看对手的牌
-        deck.append(Card(5, 'Swap'))  # 与对手交换牌
-        random.shuffle(deck)
+        # 默认数字牌1-4各两张，加上偷看(Peek)和交换(Swap)两张5号技能牌
+        deck = list(self.cards)
+        self.rng.shuffle(deck)
         return deck
 
-    def setup_game(self):
-        # 发牌
+    # ---------- 规则引擎：不做任何输入输出 ----------
+
+    def deal(self):
+        """发牌"""
+        if self.observer is not None:
+            self.observer.on_deal(self)
         for player in self.players:
-            for _ in range(2):
+            for _ in range(self.hand_size):
                 player.hand.append(self.deck.pop())
-        
+
+    def legal_actions(self):
+        """列出当前玩家所有合法的引擎动作"""
+        if self.game_over:
+            return []
+        card = self.drawn_card
+        if card is None:
+            return self._last_round_actions if self.cabo_called else self._start_actions
+        if card.skill == 'Peek':
+            return self._peek_actions
+        if card.skill == 'Swap':
+            return self._swap_actions
+        return self._replace_actions
+
+    def apply_move(self, action):
+        """执行当前玩家的一个动作（不切换玩家），返回该动作是否完成了回合"""
+        current_player = self.players[self.current_player]
+        card = self.drawn_card
+        log = self.undo_log
+
+        if card is None:
+            if action == DRAW and self.deck:
+                if self.observer is not None:
+                    self.observer.on_move(self, action)
+                if log is not None:
+                    log += (None, (_UNDO_POP, self.deck, self.deck[-1]),
+                            (_UNDO_ATTR, self, 'drawn_card', None))
+                self.drawn_card = self.deck.pop()
+                return False
+            if action == CABO and not self.cabo_called:
+                if self.observer is not None:
+                    self.observer.on_move(self, action)
+                if log is not None:
+                    log += (None, (_UNDO_ATTR, self, 'cabo_called', False),
+                            (_UNDO_ATTR, self, 'cabo_caller', None))
+                self.cabo_called = True
+                self.cabo_caller = current_player
+                return True
+            raise ValueError(f"非法动作: {action}")
+
+        kind, *args = self.unpack(action)
+        if not (kind == "discard" or (kind == "replace" and not card.skill)
+                or (kind == "peek" and card.skill == 'Peek')
+                or (kind == "swap" and card.skill == 'Swap')):
+            raise ValueError(f"非法动作: {action}")
+        if self.observer is not None:
+            self.observer.on_move(self, action)
+        if log is not None:
+            log += (None, (_UNDO_ATTR, self, 'drawn_card', card), (_UNDO_PUSH, self.discard_pile))
+
+        if kind == "replace":
+            pos = args[0]
+            if log is not None:
+                log.append((_UNDO_SLOT, current_player.hand, pos, current_player.hand[pos]))
+                self._log_memory(current_player, 'known_cards')
+            self.discard_pile.append(current_player.hand[pos])
+            current_player.hand[pos] = card
+            current_player.known_cards[pos] = card
+        elif kind == "peek":
+            opp_seat, pos = self.slot_owner(self.current_player, args[0])
+            if log is not None:
+                self._log_memory(current_player, 'known_opponent_cards')
+            current_player.peek_opponent_card(args[0], self.players[opp_seat].hand[pos])
+            self.discard_pile.append(card)
+        elif kind == "swap":
+            my_pos, slot = args
+            opp_seat, opp_pos = self.slot_owner(self.current_player, slot)
+            opponent = self.players[opp_seat]
+            my_card = current_player.hand[my_pos]
+            opp_card = opponent.hand[opp_pos]
+            if log is not None:
+                log += ((_UNDO_SLOT, current_player.hand, my_pos, my_card),
+                        (_UNDO_SLOT, opponent.hand, opp_pos, opp_card))
+                for player in (current_player, opponent):
+                    self._log_memory(player, 'known_cards')
+                    self._log_memory(player, 'known_opponent_cards')
+            current_player.hand[my_pos] = opp_card
+            opponent.hand[opp_pos] = my_card
+
+            # 如果当前玩家知道自己的牌，交换后仍然知道这张牌（现在在对手那里）
+            if my_pos in current_player.known_cards:
+                current_player.known_opponent_cards[slot] = my_card
+                del current_player.known_cards[my_pos]
+
+            # 如果对手知道自己的牌，交换后仍然知道这张牌（现在在当前玩家那里）
+            if opp_pos in opponent.known_cards:
+                their_slot = self.opponent_slot(opp_seat, self.current_player, my_pos)
+                opponent.known_opponent_cards[their_slot] = opp_card
+                del opponent.known_cards[opp_pos]
+            self.discard_pile.append(card)
+        else:
+            self.discard_pile.append(card)
+        self.drawn_card = None
+        return True
+
+    def end_turn(self):
+        """结束当前回合：判断游戏是否结束，并轮到下一位玩家"""
+        if self.undo_log is not None:
+            self.undo_log += ((_UNDO_ATTR, self, 'current_player', self.current_player),
+                              (_UNDO_ATTR, self, 'game_over', self.game_over))
+        next_player = (self.current_player + 1) % len(self.players)
+        # 牌堆耗尽，或者有人叫了Cabo且其他玩家都完成了最后一回合，游戏结束
+        if not self.deck or (self.cabo_called and self.cabo_caller is self.players[next_player]):
+            self.game_over = True
+            if self.observer is not None:
+                self.observer.on_end(self)
+        self.current_player = next_player
+
+    def apply(self, action):
+        """执行一个合法动作，动作完成回合时自动结束回合"""
+        if self.apply_move(action):
+            self.end_turn()
+
+    # ---------- 局面快照与撤销 ----------
+
+    def snapshot(self):
+        """记录当前局面（只复制牌和记忆，不复制玩家对象），之后可用 restore 恢复"""
+        return (tuple(self.deck), tuple(self.discard_pile),
+                tuple((tuple(player.hand), tuple(player.known_cards.items()),
+                       tuple(player.known_opponent_cards.items())) for player in self.players),
+                self.current_player, self.cabo_called, self.cabo_caller, self.drawn_card,
+                self.game_over)
+
+    def restore(self, snapshot):
+        """恢复到 snapshot 记录的局面；撤销日志随之清空"""
+        deck, discard_pile, players, self.current_player, self.cabo_called, \
+            self.cabo_caller, self.drawn_card, self.game_over = snapshot
+        self.deck[:] = deck
+        self.discard_pile[:] = discard_pile
+        for player, (hand, known_cards, known_opponent_cards) in zip(self.players, players):
+            player.hand[:] = hand
+            player.known_cards = dict(known_cards)
+            player.known_opponent_cards = dict(known_opponent_cards)
+        if self.undo_log is not None:
+            self.undo_log = []
+
+    def enable_undo(self, enabled=True):
+        """开启后每次 apply_move/apply 只记录被修改的位置，可用 undo 逐个撤销"""
+        self.undo_log = [] if enabled else None
+
+    def undo(self):
+        """撤销最近一次 apply（或 apply_move）"""
+        log = self.undo_log
+        if not log:
+            raise ValueError("没有可以撤销的动作")
+        while True:
+            entry = log.pop()
+            if entry is None:
+                break
+            op = entry[0]
+            if op == _UNDO_ATTR:
+                setattr(entry[1], entry[2], entry[3])
+            elif op == _UNDO_SLOT:
+                entry[1][entry[2]] = entry[3]
+            elif op == _UNDO_PUSH:
+                entry[1].pop()
+            else:
+                entry[1].append(entry[2])
+
+    def _log_memory(self, player, name):
+        # 记忆字典写时复制：日志保存旧字典，撤销时连同键的顺序一起恢复
+        memory = getattr(player, name)
+        self.undo_log.append((_UNDO_ATTR, player, name, memory))
+        setattr(player, name, dict(memory))
+
+    def final_scores(self):
+        """按Cabo规则计算每位玩家的最终得分"""
+        scores = [player.total_score() for player in self.players]
+        if self.cabo_called:
+            caller_idx = self.players.index(self.cabo_caller)
+            # 叫Cabo的玩家分数不高于其他所有人时得0分，否则加5分罚分
+            if scores[caller_idx] <= min(score for i, score in enumerate(scores) if i != caller_idx):
+                scores[caller_idx] = 0
+            else:
+                scores[caller_idx] += 5
+        return scores
+
+    def run(self):
+        """由各玩家的 act 自动完成一整局（无输入输出），返回最终得分"""
+        self.deal()
+        for player in self.players:
+            player.peek_card(player.decide_peek_initial())
+        while not self.game_over:
+            self.apply(self.players[self.current_player].act(self))
+        return self.final_scores()
+
+    # ---------- 命令行界面 ----------
+
+    def setup_game(self):
+        # 发牌
+        self.deal()
+
         # 初始偷看
         for i, player in enumerate(self.players):
             self.clear_screen()
             print(f"\n{player.name}的回合 - 初始偷看")
             self.show_game_state(i)
-            while True:
-                try:
-                    pos = int(input(f"{player.name}选择要偷看的牌 (1 或 2): ")) - 1
-                    if pos in [0, 1]:
-                        break
-                    print("请输入1或2")
-                except ValueError:
-                    print("请输入有效的数字")
+            pos = self.choose_position(f"{player.name}选择要偷看的牌")
             card = player.peek_card(pos)
             print(f"你偷看的牌是: {card}")
             input("\n按Enter继续...")
 
     def show_game_state(self, player_idx):
         current_player = self.players[player_idx]
-        opponent = self.players[1 - player_idx]
-        
+
         print("\n" + "="*50)
-        print(f"对手 ({opponent.name}) 的手牌: ", end="")
-        # 显示对手的手牌，如果有已知的牌就显示出来
-        opponent_cards = []
-        for i in range(len(opponent.hand)):
-            if i in current_player.known_opponent_cards:
-                opponent_cards.append(str(current_player.known_opponent_cards[i]))
-            else:
-                opponent_cards.append("?")
-        print(opponent_cards)
-        
+        for offset in range(1, len(self.players)):
+            opp_seat = (player_idx + offset) % len(self.players)
+            opponent = self.players[opp_seat]
+            print(f"对手 ({opponent.name}) 的手牌: ", end="")
+            # 显示对手的手牌，如果有已知的牌就显示出来
+            opponent_cards = []
+            for i in range(len(opponent.hand)):
+                slot = self.opponent_slot(player_idx, opp_seat, i)
+                if slot in current_player.known_opponent_cards:
+                    opponent_cards.append(str(current_player.known_opponent_cards[slot]))
+                else:
+                    opponent_cards.append("?")
+            print(opponent_cards)
+
         print(f"牌堆剩余: {len(self.deck)} 张")
         print(f"弃牌堆顶: {self.discard_pile[-1] if self.discard_pile else '空'}")
         print(f"你的手牌 ({current_player.name}): {current_player.show_hand()}")
@@ -119,102 +500,85 @@ class Game:
                 return choice
             print(f"请输入有效选项: {', '.join(valid_options)}")
 
+    def choose_position(self, prompt):
+        """输入手牌位置（从1开始），返回下标"""
+        options = [str(i + 1) for i in range(self.hand_size)]
+        return int(self.get_valid_input(f"{prompt} ({' 或 '.join(options)}): ", options)) - 1
+
+    def choose_opponent_slot(self, player_idx, prompt):
+        """输入对手和牌的位置，返回 player_idx 视角下的对手位置编号"""
+        opp_seat = (player_idx + 1) % len(self.players)
+        if len(self.players) > 2:
+            seats = [(player_idx + offset) % len(self.players) for offset in range(1, len(self.players))]
+            menu = "".join(f"{i + 1}. {self.players[seat].name}\n" for i, seat in enumerate(seats))
+            choice = self.get_valid_input(f"选择对手:\n{menu}请选择: ",
+                                          [str(i + 1) for i in range(len(seats))])
+            opp_seat = seats[int(choice) - 1]
+        return self.opponent_slot(player_idx, opp_seat, self.choose_position(prompt))
+
     def play_turn(self, player_idx):
         current_player = self.players[player_idx]
-        opponent = self.players[1 - player_idx]
         self.clear_screen()
         print(f"\n{current_player.name}的回合:")
         self.show_game_state(player_idx)
 
-        # 选择主要动作：摸牌或呼叫Cabo
+        # 选择主要动作：摸牌或呼叫Cabo（如果已经有人呼叫了Cabo，只能摸牌）
         if not self.cabo_called:
             main_action = self.get_valid_input("\n选择行动:\n1. 摸牌\n2. 呼叫Cabo\n请选择: ", ["1", "2"])
             if main_action == "2":
-                self.cabo_called = True
-                self.cabo_caller = current_player
+                self.apply(CABO)
                 print(f"\n{current_player.name}呼叫了Cabo！")
                 input("\n按Enter继续...")
-                return True  # 继续游戏，让对手还有一次机会
-        else:
-            main_action = "1"  # 如果已经有人呼叫了Cabo，只能摸牌
+                return not self.game_over  # 继续游戏，让对手还有一次机会
 
         # 摸牌
-        drawn_card = self.deck.pop() if self.deck else None
-        if not drawn_card:
-            print("牌堆已空，游戏结束！")
-            return False
-
+        self.apply(DRAW)
+        drawn_card = self.drawn_card
         print(f"\n摸到的牌: {drawn_card}")
-        
+
         # 处理摸到的牌
         if drawn_card.skill:
             choice = self.get_valid_input("\n1. 使用技能\n2. 弃掉\n请选择: ", ["1", "2"])
             if choice == "1":
                 if drawn_card.skill == "Peek":
-                    pos = int(self.get_valid_input("选择要偷看对手的哪张牌 (1 或 2): ", ["1", "2"])) - 1
-                    peeked_card = opponent.hand[pos]
-                    current_player.peek_opponent_card(pos, peeked_card)
-                    print(f"你偷看的对手的牌是: {peeked_card}")
+                    slot = self.choose_opponent_slot(player_idx, "选择要偷看对手的哪张牌")
+                    self.apply(peek_action(slot, self.hand_size))
+                    print(f"你偷看的对手的牌是: {current_player.known_opponent_cards[slot]}")
                     input("\n按Enter继续...")
                 elif drawn_card.skill == "Swap":
-                    my_pos = int(self.get_valid_input("选择要交换的自己的牌位置 (1 或 2): ", ["1", "2"])) - 1
-                    opp_pos = int(self.get_valid_input("选择要交换的对手的牌位置 (1 或 2): ", ["1", "2"])) - 1
-                    
-                    # 交换牌
-                    my_card = current_player.hand[my_pos]
-                    opp_card = opponent.hand[opp_pos]
-                    current_player.hand[my_pos] = opp_card
-                    opponent.hand[opp_pos] = my_card
-                    
-                    # 更新双方的已知牌信息
-                    # 如果当前玩家知道自己的牌，交换后仍然知道这张牌（现在在对手那里）
-                    if my_pos in current_player.known_cards:
-                        current_player.known_opponent_cards[opp_pos] = my_card
-                        del current_player.known_cards[my_pos]
-                    
-                    # 如果对手知道自己的牌，交换后仍然知道这张牌（现在在当前玩家那里）
-                    if opp_pos in opponent.known_cards:
-                        opponent.known_opponent_cards[my_pos] = opp_card
-                        del opponent.known_cards[opp_pos]
-                    
+                    my_pos = self.choose_position("选择要交换的自己的牌位置")
+                    slot = self.choose_opponent_slot(player_idx, "选择要交换的对手的牌位置")
+                    self.apply(swap_action(my_pos, slot, self.hand_size, len(self.players)))
                     print("交换完成！")
                     input("\n按Enter继续...")
-            self.discard_pile.append(drawn_card)
+            else:
+                self.apply(DISCARD)
         else:
             # 普通牌的操作
             choice = self.get_valid_input("\n1. 与手牌交换\n2. 弃掉\n请选择: ", ["1", "2"])
             if choice == "1":
-                pos = int(self.get_valid_input("选择要交换的手牌位置 (1 或 2): ", ["1", "2"])) - 1
-                old_card = current_player.hand[pos]
-                current_player.hand[pos] = drawn_card
-                current_player.known_cards[pos] = drawn_card
-                self.discard_pile.append(old_card)
+                pos = self.choose_position("选择要交换的手牌位置")
+                self.apply(replace_action(pos))
                 print("交换完成！")
             else:
-                self.discard_pile.append(drawn_card)
+                self.apply(DISCARD)
                 print("已弃掉摸到的牌")
 
         # 更新显示
         self.clear_screen()
         self.show_game_state(player_idx)
-        
+
         # 回合结束提示
         print(f"\n{current_player.name}的回合结束")
         input("\n按Enter继续...")
 
-        # 如果已经有人叫了Cabo，并且对手也完成了最后一回合，游戏结束
-        if self.cabo_called and self.cabo_caller != current_player:
-            return False
-
-        return True
+        return not self.game_over
 
     def play_game(self):
         self.setup_game()
-        game_continue = True
-        
-        while game_continue and self.deck:
-            game_continue = self.play_turn(self.current_player)
-            self.current_player = 1 - self.current_player
+
+        while not self.game_over:
+            self.play_turn(self.current_player)
 
         # 游戏结束，显示结果
         self.clear_screen()
@@ -224,31 +588,28 @@ class Game:
             print(f"{player.name}的手牌点数: {player.total_score()}")
 
         # 判断胜负和计算最终得分
+        final_scores = self.final_scores()
         if self.cabo_called:
-            caller_score = self.cabo_caller.total_score()
-            other_player = self.players[1 - self.players.index(self.cabo_caller)]
-            other_score = other_player.total_score()
-            
+            caller_idx = self.players.index(self.cabo_caller)
+
             print("\n" + "="*20 + " 最终结果 " + "="*20)
             print(f"\n{self.cabo_caller.name} 呼叫了Cabo!")
-            if caller_score <= other_score:
+            if final_scores[caller_idx] == 0:
                 print(f"{self.cabo_caller.name} 是分数最低的")
-                final_caller_score = 0
-                final_other_score = other_score
             else:
                 print(f"{self.cabo_caller.name} 不是分数最低的")
-                final_caller_score = caller_score + 5
-                final_other_score = other_score
-            
-            print(f"\n{self.cabo_caller.name} 最终得分: {final_caller_score}")
-            print(f"{other_player.name} 最终得分: {final_other_score}")
+
+            print(f"\n{self.cabo_caller.name} 最终得分: {final_scores[caller_idx]}")
+            for i, player in enumerate(self.players):
+                if i != caller_idx:
+                    print(f"{player.name} 最终得分: {final_scores[i]}")
         else:
             # 如果是因为牌堆空了而结束
             print("\n" + "="*20 + " 最终结果 " + "="*20)
             print("\n没有人呼叫Cabo，游戏因牌堆耗尽而结束")
-            for player in self.players:
-                print(f"{player.name} 最终得分: {player.total_score()}")
+            for player, score in zip(self.players, final_scores):
+                print(f"{player.name} 最终得分: {score}")
 
 if __name__ == "__main__":
     game = Game()
-    game.play_game() 
\ No newline at end of file
+    game.play_game()
@@ -0,0 +1,213 @@
+import os
+import struct
+from collections import namedtuple
+
+from game_cabo import Game, Card, CARDS, num_actions
+
+# 文件头：魔数、版本号、牌组张数，随后每张牌两个字节（点数, 技能编号）
+MAGIC = b'CABR'
+VERSION = 1
+SKILL_CODES = {None: 0, 'Peek': 1, 'Swap': 2}
+SKILLS = {code: skill for skill, code in SKILL_CODES.items()}
+
+# 每局一条记录：定长头 (人数, 手牌数, 标志, 牌堆张数, 动作数)，
+# 随后是牌堆（牌组下标，最后一个是堆顶）、每位玩家开局已知位置的位掩码、每个动作一个字节
+GAME_HEADER = struct.Struct('<BBBBH')
+SINGLE_SEAT = 1  # 训练环境的记录：回放时不结束回合
+MAX_HAND_SIZE = 8  # 已知位置的位掩码只有一个字节
+
+# 从文件读出的一局
+#   cards       文件的牌组（所有记录共用）
+#   deck        发牌前的牌堆，牌组下标，最后一个是堆顶
+#   peeks       每位玩家开局已知的自己手牌位置（位掩码）
+#   actions     依次执行的引擎动作
+GameRecord = namedtuple('GameRecord', ('cards', 'num_players', 'hand_size', 'single_seat',
+                                       'deck', 'peeks', 'actions'))
+
+
+def _encode_cards(cards):
+    data = bytearray(MAGIC)
+    data += bytes((VERSION, len(cards)))
+    for card in cards:
+        data += bytes((card.number, SKILL_CODES[card.skill]))
+    return bytes(data)
+
+
+def _read_cards(f):
+    head = f.read(len(MAGIC) + 2)
+    if len(head) < len(MAGIC) + 2 or head[:len(MAGIC)] != MAGIC:
+        raise ValueError("不是对局记录文件")
+    if head[len(MAGIC)] != VERSION:
+        raise ValueError(f"不支持的记录版本: {head[len(MAGIC)]}")
+    data = f.read(2 * head[-1])
+    cards = tuple(Card(data[i], SKILLS[data[i + 1]]) for i in range(0, len(data), 2))
+    # 标准牌组还原为共享的 CARDS
+    if [(c.number, c.skill) for c in cards] == [(c.number, c.skill) for c in CARDS]:
+        return CARDS
+    return cards
+
+
+def _check_table(game):
+    # 人数、牌堆张数、牌组下标和动作编码各占一个字节，装不下的牌桌在发牌时就拒绝，
+    # 而不是打到一半才因为某个值超出字节范围而丢掉整局
+    players, hand_size = len(game.players), game.hand_size
+    if players > 255:
+        raise ValueError(f"对局记录最多支持 255 位玩家，这一桌有 {players} 位")
+    if hand_size > MAX_HAND_SIZE:
+        raise ValueError(f"对局记录最多支持每人 {MAX_HAND_SIZE} 张手牌，这一桌每人 {hand_size} 张")
+    if len(game.cards) > 255:
+        raise ValueError(f"对局记录最多支持 255 张牌的牌组，这一桌有 {len(game.cards)} 张")
+    actions = num_actions(hand_size, players)
+    if actions > 256:
+        raise ValueError(f"{players} 人每人 {hand_size} 张手牌的牌桌有 {actions} 种动作编码，"
+                         f"超出对局记录的单字节范围（最多 256 种）")
+
+
+class GameRecorder:
+    """把每局的发牌和动作序列追加写入二进制记录文件
+
+    用 Game（或 CaboEnv）的 add_observer 挂上即可，每局只在结束时整条写入，
+    未打完就重新发牌的对局会被丢弃。同一文件的所有对局必须使用同一副牌组。
+    每个值按单字节存储，动作编码超过256种或每人超过8张手牌的牌桌在发牌时抛出 ValueError。
+    """
+
+    def __init__(self, path, buffer_size=1 << 16):
+        self.path = path
+        self.buffer_size = buffer_size
+        self.cards = None
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb') as f:
+                self.cards = _read_cards(f)
+        self.file = open(path, 'ab')
+        self.buffer = bytearray()
+        self.games = 0
+        self._index = None
+        self._deck = None
+
+    def _bind(self, game):
+        _check_table(game)
+        if self._index is not None and self._index[0] is game.cards:
+            return
+        if self.cards is None:
+            self.cards = game.cards
+            self.buffer += _encode_cards(self.cards)
+        elif [(c.number, c.skill) for c in game.cards] != [(c.number, c.skill) for c in self.cards]:
+            raise ValueError("对局使用的牌组与记录文件不一致")
+        # 同一副牌里的 Card 对象按身份映射到牌组下标
+        self._index = (game.cards, {id(card): i for i, card in enumerate(self.cards)})
+        if self.cards is not game.cards:
+            self._index[1].update((id(card), i) for i, card in enumerate(game.cards))
+
+    def _card_index(self, card):
+        index = self._index[1].get(id(card))
+        if index is None:
+            # 自行创建的 Card 对象按点数和技能匹配
+            for i, known in enumerate(self.cards):
+                if known.number == card.number and known.skill == card.skill:
+                    return i
+            raise ValueError(f"牌组里没有卡牌 {card}")
+        return index
+
+    def on_deal(self, game):
+        self._bind(game)
+        self._deck = bytes(self._card_index(card) for card in game.deck)
+        self._peeks = None
+        self._actions = bytearray()
+
+    def on_move(self, game, action):
+        if self._deck is None:
+            return
+        if self._peeks is None:
+            self._peeks = self._known_positions(game)
+        self._actions.append(action)
+
+    def on_end(self, game):
+        if self._deck is None:
+            return
+        if self._peeks is None:
+            self._peeks = self._known_positions(game)
+        flags = SINGLE_SEAT if game.single_seat else 0
+        self.buffer += GAME_HEADER.pack(len(game.players), game.hand_size, flags,
+                                        len(self._deck), len(self._actions))
+        self.buffer += self._deck
+        self.buffer += self._peeks
+        self.buffer += self._actions
+        self._deck = None
+        self.games += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    @staticmethod
+    def _known_positions(game):
+        # 第一个动作之前每位玩家已知的位置，即开局偷看的结果
+        return bytes(sum(1 << pos for pos in player.known_cards) for player in game.players)
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_games(path, chunk_size=1 << 20):
+    """逐局读取记录文件（生成器），每次只把一块数据读入内存"""
+    with open(path, 'rb') as f:
+        cards = _read_cards(f)
+        data = b''
+        offset = 0
+        while True:
+            chunk = f.read(chunk_size)
+            data = data[offset:] + chunk
+            offset = 0
+            end = len(data)
+            while end - offset >= GAME_HEADER.size:
+                players, hand_size, flags, deck_size, count = GAME_HEADER.unpack_from(data, offset)
+                start = offset + GAME_HEADER.size
+                stop = start + deck_size + players + count
+                if stop > end:
+                    break
+                yield GameRecord(cards, players, hand_size, bool(flags & SINGLE_SEAT),
+                                 data[start:start + deck_size],
+                                 data[start + deck_size:start + deck_size + players],
+                                 data[stop - count:stop])
+                offset = stop
+            if not chunk:
+                if offset != end:
+                    raise ValueError("记录文件末尾不完整")
+                return
+
+
+def replay(record, game=None):
+    """按记录重建对局：发牌并完成开局偷看后产出一次，之后每执行一个动作产出一次
+
+    每次产出的是同一个 Game 对象，需要保留中间局面时请用 game.snapshot()。
+    """
+    if game is None:
+        game = Game(record.num_players, record.hand_size, record.cards)
+    game.reset_table([record.cards[i] for i in record.deck])
+    game.deal()
+    for player, mask in zip(game.players, record.peeks):
+        for pos in range(record.hand_size):
+            if mask >> pos & 1:
+                player.peek_card(pos)
+    yield game
+    for action in record.actions:
+        if game.apply_move(action) and not record.single_seat:
+            game.end_turn()
+        yield game
+
+
+def final_game(record, game=None):
+    """按记录重建到终局，返回 Game 对象"""
+    for game in replay(record, game):
+        pass
+    return game
@@ -0,0 +1,140 @@
+import os
+from collections import deque
+
+import numpy as np
+import torch
+
+from game_cabo import split_seed
+from train_ai_player import CaboAIPlayer, VecCaboEnv, frozen_model, shaped_transitions
+
+LAYERS = (('fc1', 'ln1'), ('fc2', 'ln2'), ('fc3', 'ln3'))
+
+
+class OpponentPool:
+    """冻结的历史网络池，成员0始终是学习者当前参数的副本
+
+    所有成员的参数按层堆叠成 (K, 输出, 输入) 的张量，q_values 把各行按成员分组、
+    补齐成 (K, 最大行数, 输入) 后用一次批量矩阵乘法完成整批前向传播，
+    所以学习席位和对手席位的观测只需要一次前向传播。
+    """
+
+    def __init__(self, learner_model, capacity=5):
+        self.learner_model = learner_model
+        self.capacity = capacity
+        self.members = [frozen_model(learner_model)]  # 成员0由 sync_learner 刷新
+        self._stack()
+
+    def __len__(self):
+        return len(self.members)
+
+    def _stack(self):
+        with torch.no_grad():
+            self.stacked = {name: torch.stack([member.state_dict()[name] for member in self.members])
+                            for name in self.members[0].state_dict()}
+
+    def add(self, model):
+        """把 model 的当前参数冻结后放进池子，超出容量时淘汰最早的历史成员"""
+        self.members.append(frozen_model(model))
+        if len(self.members) > self.capacity + 1:
+            del self.members[1]
+        self._stack()
+
+    def sync_learner(self):
+        """把学习者的最新参数拷进成员0"""
+        with torch.no_grad():
+            for name, value in self.learner_model.state_dict().items():
+                self.stacked[name][0].copy_(value)
+
+    def sample(self, rng):
+        """随机取一个历史成员（还没有历史成员时取学习者自己）"""
+        return rng.randrange(1, len(self.members)) if len(self.members) > 1 else 0
+
+    def q_values(self, states, members):
+        """第 i 行观测由成员 members[i] 估值，返回 (M, 动作数) 的Q值，与各自 DQN.forward 一致"""
+        members = np.asarray(members)
+        order = np.argsort(members, kind='stable')
+        grouped = members[order]
+        counts = np.bincount(members, minlength=len(self.members))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        rows = np.arange(len(members)) - starts[grouped]
+        x = torch.zeros(len(self.members), int(counts.max()), states.shape[1])
+        x[grouped, rows] = torch.from_numpy(np.asarray(states, dtype=np.float32)[order])
+        p = self.stacked
+        with torch.no_grad():
+            for fc, ln in LAYERS:
+                x = torch.baddbmm(p[f'{fc}.bias'].unsqueeze(1), x, p[f'{fc}.weight'].transpose(1, 2))
+                x = torch.nn.functional.layer_norm(x, x.shape[-1:], eps=1e-5)
+                x = torch.relu(x * p[f'{ln}.weight'].unsqueeze(1) + p[f'{ln}.bias'].unsqueeze(1))
+            x = torch.baddbmm(p['fc4.bias'].unsqueeze(1), x, p['fc4.weight'].transpose(1, 2))
+        q = torch.empty(len(members), x.shape[-1])
+        q[torch.from_numpy(order)] = x[grouped, rows]
+        return q
+
+
+def train_self_play(save_path="cabo_ai_model.pth", episodes=100000, num_envs=64, pool_size=5,
+                    snapshot_interval=1000, seed=None, prioritized=False):
+    """两个席位轮流行动的自我对弈训练
+
+    对手席位从冻结的历史网络池里抽取（每局重新抽），学习者每完成 snapshot_interval 局
+    就把当前参数加入池子。每个批量步两个席位的观测一起做一次前向传播，只有学习席位
+    的经验进入经验池。
+    """
+    env = VecCaboEnv(num_envs, seed, self_play=True)
+    learner = CaboAIPlayer("AI_1", None if seed is None else split_seed(seed, "learner"), prioritized)
+    if os.path.exists(save_path):
+        learner.load_model(save_path)
+    pool = OpponentPool(learner.model, pool_size)
+    pool.add(learner.model)
+    opponents = np.array([pool.sample(learner.rng) for _ in range(num_envs)])
+
+    best_reward = float('-inf')
+    rewards_window = deque(maxlen=100)
+    trajectories = [[] for _ in range(num_envs)]
+    states = env.states.copy()
+    finished = 0
+
+    print(f"开始自我对弈训练，{num_envs} 个并行环境，对手池容量 {pool_size}")
+
+    while finished < episodes:
+        learner_rows = env.seats == env.learner_seats
+        pool.sync_learner()
+        q_values = pool.q_values(states, np.where(learner_rows, 0, opponents))
+        actions = learner.epsilon_greedy(q_values, np.flatnonzero(learner_rows))
+        next_states, rewards, dones = env.step(actions)
+        for i in range(num_envs):
+            if learner_rows[i]:
+                trajectories[i].append((states[i].copy(), int(actions[i]), float(rewards[i])))
+            if not dones[i]:
+                continue
+            trajectory = trajectories[i]
+            if env.caller_rewards[i]:
+                # 学习席位叫的Cabo：终局奖励记到它这局的最后一步
+                state, action, reward = trajectory[-1]
+                trajectory[-1] = (state, action, reward + float(env.caller_rewards[i]))
+            for transition in shaped_transitions(trajectory, env.final_states[i].copy(),
+                                                 env.score_diffs[i], learner.gamma):
+                learner.remember(*transition)
+            rewards_window.append(sum(reward for _, _, reward in trajectory))
+            trajectories[i] = []
+            opponents[i] = pool.sample(learner.rng)
+            finished += 1
+
+            if finished % snapshot_interval == 0:
+                pool.add(learner.model)
+            if finished % 100 == 0:
+                avg_reward = sum(rewards_window) / len(rewards_window)
+                print(f"Episode: {finished}, Avg Reward: {avg_reward:.2f}, "
+                      f"Epsilon: {learner.epsilon:.3f}, 对手池: {len(pool) - 1}")
+                if avg_reward > best_reward:
+                    best_reward = avg_reward
+                    learner.save_model(save_path)
+        states[:] = next_states
+
+        if len(learner.memory) > learner.batch_size:
+            learner.replay(learner.batch_size)
+
+    return learner
+
+
+if __name__ == "__main__":
+    train_self_play()
@@ -1,17 +1,36 @@
-from game_cabo import Game, Player, Card
+from game_cabo import (Game, Player, Card, CARDS, HAND_SIZE, DRAW, CABO, DISCARD, REPLACE, SWAP,
+                       replace_action, peek_action, swap_action, unpack_action)
+from cabo_state import (from_game, known_card, known_opponent_card, SimTable, CARD_NUMBERS,
+                        CARD_SKILLS, NO_CARD)
+from concurrent.futures import ProcessPoolExecutor
+import math
 import random
+import time
 
 class SmartPlayer(Player):
-    def __init__(self, name):
-        super().__init__(name)
+    # 规则里的阈值（可由 tune_smart.py 搜索）
+    DEFAULT_PARAMS = {
+        'cabo_avg': 2,      # 已知牌平均分不超过它就叫Cabo
+        'cabo_sum': 5,      # 知道所有牌且总分不超过它就叫Cabo
+        'cabo_card': 1,     # 知道有一张牌不超过它就叫Cabo
+        'swap_mine': 4,     # 自己已知最大的牌至少为它
+        'swap_theirs': 2,   # 且对手已知最小的牌至多为它时交换
+    }
+
+    def __init__(self, name, rng=None, **params):
+        super().__init__(name, rng)
+        unknown = set(params) - set(self.DEFAULT_PARAMS)
+        if unknown:
+            raise TypeError(f"未知的参数: {', '.join(sorted(unknown))}")
+        self.params = {**self.DEFAULT_PARAMS, **params}
         self.memory = {}  # 记录所有已知的牌信息，包括弃牌堆
         self.known_opponent_cards = {}  # 记录对手已知的牌
 
     def decide_peek_initial(self):
         """决定初始要看哪张牌"""
         # 随机选择一张未知的牌
-        unknown_positions = [i for i in range(2) if i not in self.known_cards]
-        return random.choice(unknown_positions)
+        unknown_positions = [i for i in range(len(self.hand)) if i not in self.known_cards]
+        return self.rng.choice(unknown_positions)
 
     def should_call_cabo(self):
         """决定是否要叫Cabo"""
@@ -22,20 +41,21 @@ class SmartPlayer(Player):
             known_sum += card.number
             known_count += 1
         
+        params = self.params
         # 如果已知牌的平均分小于等于2，而且知道至少一张牌，就考虑叫Cabo
         if known_count > 0:
             avg_score = known_sum / known_count
             # 更保守的策略，因为叫错Cabo会加5分惩罚
-            if avg_score <= 2:
+            if avg_score <= params['cabo_avg']:
                 return True
             # 如果知道所有牌，且总分较低，也叫Cabo
-            if known_count == len(self.hand) and known_sum <= 5:
+            if known_count == len(self.hand) and known_sum <= params['cabo_sum']:
                 return True
             
             # 如果知道一张牌是0或1，也考虑叫Cabo
             # 因为即使另一张是较大的数，总分也不会太高
             for card in self.known_cards.values():
-                if card.number <= 1:
+                if card.number <= params['cabo_card']:
                     return True
         return False
 
@@ -56,7 +76,9 @@ class SmartPlayer(Player):
                 opp_min_val = card.number
                 opp_min_pos = pos
 
-        if my_max_val >= 4 and opp_min_val <= 2:
+        if my_max_pos is None or opp_min_pos is None:
+            return None
+        if my_max_val >= self.params['swap_mine'] and opp_min_val <= self.params['swap_theirs']:
             return (my_max_pos, opp_min_pos)
         return None
 
@@ -75,21 +97,213 @@ class SmartPlayer(Player):
         """记录偷看到的对手的牌"""
         self.known_opponent_cards[pos] = card
 
+    def act(self, game):
+        """把规则决策翻译成引擎动作"""
+        drawn_card = game.drawn_card
+        if drawn_card is None:
+            if not game.cabo_called and self.should_call_cabo():
+                return CABO
+            return DRAW
+
+        action = self.decide_action_for_drawn_card(drawn_card, self.known_cards)
+        if action == "use":
+            if drawn_card.skill == "Peek":
+                unknown_positions = [i for i in range(game.opponent_slots)
+                                     if i not in self.known_opponent_cards]
+                if unknown_positions:
+                    return peek_action(self.rng.choice(unknown_positions), game.hand_size)
+            elif drawn_card.skill == "Swap":
+                swap_decision = self.decide_swap_with_opponent(self.known_cards, self.known_opponent_cards)
+                if swap_decision:
+                    return swap_action(*swap_decision, game.hand_size, len(game.players))
+        elif isinstance(action, tuple) and action[0] == "swap":
+            return replace_action(action[1])
+        return DISCARD
+
+class RandomPlayer(Player):
+    """随机基线：每一步从合法动作中均匀随机选择"""
+
+    def act(self, game):
+        return self.rng.choice(game.legal_actions())
+
+class MCTSPlayer(Player):
+    """信息集蒙特卡洛树搜索(ISMCTS)玩家
+
+    每次迭代先按自己掌握的信息（已知的牌、偷看到的对手牌、弃牌堆）随机补全隐藏的牌，
+    再在这个确定化的局面上用UCT搜索；每步的搜索预算可以按迭代次数或毫秒数设置（至少设一个）。
+    workers 大于1时用进程池做根节点并行，各进程独立搜索后合并根节点的访问次数；
+    用完后调用 close()（或用 with 语句）关闭进程池。
+    """
+
+    def __init__(self, name, rng=None, iterations=2000, time_ms=None, exploration=0.7, workers=1):
+        super().__init__(name, rng)
+        if not (iterations and iterations > 0) and not (time_ms and time_ms > 0):
+            raise ValueError("iterations 和 time_ms 至少要有一个是正数，否则搜索不会结束")
+        self.iterations = iterations
+        self.time_ms = time_ms
+        self.exploration = exploration
+        self.workers = workers
+        self._pool = None
+
+    def act(self, game):
+        actions = game.legal_actions()
+        if len(actions) == 1:
+            return actions[0]
+        state = from_game(game)
+        seat = game.current_player
+        if self.workers > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers)
+            jobs = [self._pool.submit(ismcts_search, state, seat, self.iterations, self.time_ms,
+                                      self.exploration, self.rng.getrandbits(64))
+                    for _ in range(self.workers)]
+            visits = {}
+            for job in jobs:
+                for action, count in job.result().items():
+                    visits[action] = visits.get(action, 0) + count
+        else:
+            visits = ismcts_search(state, seat, self.iterations, self.time_ms,
+                                   self.exploration, self.rng.getrandbits(64))
+        return max(actions, key=lambda action: visits.get(action, 0))
+
+    def close(self):
+        """关闭根并行使用的进程池"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+class _Node:
+    __slots__ = ('children', 'mover', 'visits', 'reward', 'avail')
+
+    def __init__(self, mover):
+        self.children = {}
+        self.mover = mover  # 走到这个节点的那一步是谁走的
+        self.visits = 0
+        self.reward = 0.0
+        self.avail = 1
+
+def determinize(state, seat, rng):
+    """按 seat 玩家掌握的信息随机补全隐藏的牌，返回 (牌堆, 双方手牌)"""
+    opponent = 1 - seat
+    used = set(state.discard)
+    if state.drawn != NO_CARD:
+        used.add(state.drawn)
+    hands = [[NO_CARD] * HAND_SIZE for _ in range(2)]
+    for pos in range(HAND_SIZE):
+        cid = known_card(state, seat, pos)
+        if cid != NO_CARD:
+            hands[seat][pos] = cid
+            used.add(cid)
+    # 记忆可能已经过时（那张牌已经出现在别处），这时当作不知道
+    for pos in range(HAND_SIZE):
+        cid = known_opponent_card(state, seat, pos)
+        if cid != NO_CARD and cid not in used:
+            hands[opponent][pos] = cid
+            used.add(cid)
+    pool = [cid for cid in range(len(CARDS)) if cid not in used]
+    rng.shuffle(pool)
+    for hand in hands:
+        for pos in range(HAND_SIZE):
+            if hand[pos] == NO_CARD:
+                hand[pos] = pool.pop()
+    return pool, hands
+
+def _rollout_action(table, actions, rng):
+    """快速模拟策略：偶尔叫Cabo，摸到的牌能降低分数就用"""
+    if table.drawn == NO_CARD:
+        return CABO if len(actions) > 1 and rng.random() < 0.15 else DRAW
+    mine = table.hands[table.current]
+    high = max(range(HAND_SIZE), key=lambda pos: CARD_NUMBERS[mine[pos]])
+    skill = CARD_SKILLS[table.drawn]
+    if skill == 'Swap':
+        theirs = table.hands[1 - table.current]
+        low = min(range(HAND_SIZE), key=lambda pos: CARD_NUMBERS[theirs[pos]])
+        if CARD_NUMBERS[theirs[low]] < CARD_NUMBERS[mine[high]]:
+            return SWAP + high * HAND_SIZE + low
+    elif skill is None and CARD_NUMBERS[table.drawn] < CARD_NUMBERS[mine[high]]:
+        return REPLACE + high
+    return DISCARD
+
+def ismcts_search(state, seat, iterations=2000, time_ms=None, exploration=0.7, seed=None):
+    """从 CompactState 出发为 seat 玩家搜索，返回根节点各动作的访问次数"""
+    rng = random.Random(seed)
+    table = SimTable()
+    root = _Node(1 - seat)
+    deadline = time.perf_counter() + time_ms / 1000 if time_ms else None
+    caller = state.caller
+    done = 0
+    while (iterations is None or done < iterations) and \
+            (deadline is None or done % 16 or time.perf_counter() < deadline):
+        done += 1
+        deck, hands = determinize(state, seat, rng)
+        table.load(deck, hands, state.current, caller, state.drawn)
+
+        # 选择与扩展：自己摸牌时按摸到的牌分支，对手摸到什么看不见
+        node = root
+        path = [root]
+        while not table.over:
+            actions = table.legal_actions()
+            keys = []
+            for action in actions:
+                if action == DRAW and table.current == seat:
+                    keys.append((DRAW, CARD_NUMBERS[table.deck[-1]], CARD_SKILLS[table.deck[-1]]))
+                else:
+                    keys.append(action)
+            untried = [i for i, key in enumerate(keys) if key not in node.children]
+            if untried:
+                i = rng.choice(untried)
+                child = node.children[keys[i]] = _Node(table.current)
+                table.apply(actions[i])
+                path.append(child)
+                break
+            best, best_score = None, -math.inf
+            for i, key in enumerate(keys):
+                child = node.children[key]
+                child.avail += 1
+                score = child.reward / child.visits + \
+                    exploration * math.sqrt(math.log(child.avail) / child.visits)
+                if score > best_score:
+                    best, best_score = i, score
+            node = node.children[keys[best]]
+            table.apply(actions[best])
+            path.append(node)
+
+        # 模拟到终局
+        while not table.over:
+            table.apply(_rollout_action(table, table.legal_actions(), rng))
+        scores = table.final_scores()
+        reward = min(1.0, max(0.0, 0.5 + (scores[1 - seat] - scores[seat]) / 40))
+
+        for node in path:
+            node.visits += 1
+            node.reward += reward if node.mover == seat else 1.0 - reward
+
+    visits = {}
+    for key, child in root.children.items():
+        action = key[0] if isinstance(key, tuple) else key
+        visits[action] = visits.get(action, 0) + child.visits
+    return visits
+
 class SmartGame(Game):
-    def __init__(self):
-        self.deck = self.create_deck()
-        self.players = [SmartPlayer("智能玩家A"), SmartPlayer("智能玩家B")]
-        self.discard_pile = []
-        self.current_player = 0
-        self.cabo_called = False
-        self.cabo_caller = None
+    def __init__(self, rng=None):
+        super().__init__(rng=rng)
+        self.players = [SmartPlayer("智能玩家A", self.rng), SmartPlayer("智能玩家B", self.rng)]
 
     def setup_game(self):
         # 发牌
-        for player in self.players:
-            for _ in range(2):
-                player.hand.append(self.deck.pop())
-        
+        self.deal()
+
         # AI自主决定初始偷看
         for i, player in enumerate(self.players):
             pos = player.decide_peek_initial()
@@ -98,65 +312,34 @@ class SmartGame(Game):
 
     def play_turn(self, player_idx):
         current_player = self.players[player_idx]
-        opponent = self.players[1 - player_idx]
 
         # AI决策是否叫Cabo
-        if not self.cabo_called and current_player.should_call_cabo():
-            self.cabo_called = True
-            self.cabo_caller = current_player
+        if current_player.act(self) == CABO:
+            self.apply(CABO)
             print(f"{current_player.name}呼叫了Cabo!")
-            return True
+            return not self.game_over
 
         # 摸牌
-        drawn_card = self.deck.pop() if self.deck else None
-        if not drawn_card:
-            return False
-
-        print(f"\n{current_player.name} <- {drawn_card}", end=" ")
+        self.apply(DRAW)
+        print(f"\n{current_player.name} <- {self.drawn_card}", end=" ")
 
         # 处理摸到的牌
-        if drawn_card.skill:
-            action = current_player.decide_action_for_drawn_card(drawn_card, current_player.known_cards)
-            if action == "use":
-                if drawn_card.skill == "Peek":
-                    unknown_positions = [i for i in range(2) if i not in current_player.known_opponent_cards]
-                    if unknown_positions:
-                        pos = random.choice(unknown_positions)
-                        peeked_card = opponent.hand[pos]
-                        current_player.peek_opponent_card(pos, peeked_card)
-                        print(f"[偷看对手第{pos+1}张牌]")
-                
-                elif drawn_card.skill == "Swap":
-                    swap_decision = current_player.decide_swap_with_opponent(
-                        current_player.known_cards,
-                        current_player.known_opponent_cards
-                    )
-                    if swap_decision:
-                        my_pos, opp_pos = swap_decision
-                        my_card = current_player.hand[my_pos]
-                        opp_card = opponent.hand[opp_pos]
-                        current_player.hand[my_pos] = opp_card
-                        opponent.hand[opp_pos] = my_card
-                        print(f"[交换{my_pos+1}号牌与对手{opp_pos+1}号牌]")
-            self.discard_pile.append(drawn_card)
-        else:
-            action = current_player.decide_action_for_drawn_card(drawn_card, current_player.known_cards)
-            if isinstance(action, tuple) and action[0] == "swap":
-                pos = action[1]
-                old_card = current_player.hand[pos]
-                current_player.hand[pos] = drawn_card
-                current_player.known_cards[pos] = drawn_card
-                self.discard_pile.append(old_card)
-                print(f"[替换{pos+1}号牌]")
-            else:
-                self.discard_pile.append(drawn_card)
-                print("[弃牌]")
-
-        if self.cabo_called and self.cabo_caller != current_player:
-            return False
-
-        return True
+        is_skill = bool(self.drawn_card.skill)
+        action = current_player.act(self)
+        self.apply(action)
+
+        kind, *args = unpack_action(action)
+        if kind == "peek":
+            print(f"[偷看对手第{args[0]+1}张牌]")
+        elif kind == "swap":
+            print(f"[交换{args[0]+1}号牌与对手{args[1]+1}号牌]")
+        elif kind == "replace":
+            print(f"[替换{args[0]+1}号牌]")
+        elif not is_skill:
+            print("[弃牌]")
+
+        return not self.game_over
 
 if __name__ == "__main__":
     game = SmartGame()
-    game.play_game() 
\ No newline at end of file
+    game.play_game()
@@ -0,0 +1,149 @@
+from functools import lru_cache
+
+import numpy as np
+
+from game_cabo import Game, Card, HAND_SIZE, PEEK, Player, peek_action
+from smart_cabo_players import SmartPlayer
+from batch_game import NUMBERS, PEEK_ID, SWAP_ID, UNKNOWN
+
+# SmartPlayer 决策时用到的全部信息，编码成一个整数下标：
+#   自己两张牌、对手两张牌：0 未知，1-5 为点数
+#   两张都知道时是否先记住了第2张（规则按记忆顺序遍历，平局时取先记住的）
+#   摸到的牌：0 还没摸牌，1-5 为数字牌点数，6 Peek，7 Swap
+#   是否已经有人叫了Cabo
+SLOT_CODES = 6
+DRAWN_CODES = 8
+DRAWN_PEEK = 6
+DRAWN_SWAP = 7
+TABLE_SIZE = (SLOT_CODES * SLOT_CODES * 2) ** 2 * DRAWN_CODES * 2
+PEEK_RANDOM = -2  # 随机偷看一张还不知道的对手牌
+
+
+def state_index(own, own_order, opp, opp_order, drawn, cabo_called):
+    index = 0
+    for code, size in ((own[0], SLOT_CODES), (own[1], SLOT_CODES), (own_order, 2),
+                       (opp[0], SLOT_CODES), (opp[1], SLOT_CODES), (opp_order, 2),
+                       (drawn, DRAWN_CODES), (cabo_called, 2)):
+        index = index * size + code
+    return index
+
+
+def _memory_codes(memory):
+    codes = [0] * HAND_SIZE
+    for pos, card in memory.items():
+        codes[pos] = card.number
+    return codes, int(len(memory) == HAND_SIZE and next(iter(memory)) == 1)
+
+
+def _drawn_code(card):
+    if card is None:
+        return 0
+    if card.skill == 'Peek':
+        return DRAWN_PEEK
+    if card.skill == 'Swap':
+        return DRAWN_SWAP
+    return card.number
+
+
+def _memory(codes, order):
+    positions = range(HAND_SIZE - 1, -1, -1) if order else range(HAND_SIZE)
+    return {pos: Card(codes[pos]) for pos in positions if codes[pos]}
+
+
+class _FirstChoice:
+    """编译时代替随机数：总是取第一个，并记下是否真的有多个选项"""
+
+    def __init__(self):
+        self.random = False
+
+    def choice(self, options):
+        self.random = len(options) > 1
+        return options[0]
+
+
+def compile_table(**params):
+    """逐个枚举信息状态，调用 SmartPlayer.act 生成决策表（int8 引擎动作，PEEK_RANDOM 为随机偷看）
+
+    params 是传给 SmartPlayer 的规则阈值。
+    """
+    table = np.empty(TABLE_SIZE, dtype=np.int8)
+    player = SmartPlayer("编译", **params)
+    player.hand = [None] * HAND_SIZE  # 叫Cabo的规则要用到手牌张数
+    game = Game()
+    drawn_cards = [None] + [Card(number) for number in range(1, 6)] + [Card(5, 'Peek'), Card(5, 'Swap')]
+    slot_pairs = [(a, b) for a in range(SLOT_CODES) for b in range(SLOT_CODES)]
+    # 顺序位只在两张都知道时有意义，其余组合与顺序位为0时相同
+    for own in slot_pairs:
+        for own_order in range(2):
+            for opp in slot_pairs:
+                for opp_order in range(2):
+                    for drawn in range(DRAWN_CODES):
+                        for cabo_called in range(2):
+                            player.known_cards = _memory(own, own_order)
+                            player.known_opponent_cards = _memory(opp, opp_order)
+                            player.rng = _FirstChoice()
+                            game.drawn_card = drawn_cards[drawn]
+                            game.cabo_called = bool(cabo_called)
+                            action = player.act(game)
+                            if player.rng.random:
+                                action = PEEK_RANDOM
+                            index = state_index(own, own_order, opp, opp_order, drawn, cabo_called)
+                            table[index] = action
+    return table
+
+
+@lru_cache(maxsize=None)
+def smart_table(**params):
+    """编译好的决策表（每组参数在每个进程里只编译一次）"""
+    table = compile_table(**params)
+    table.flags.writeable = False
+    return table
+
+
+class TablePlayer(Player):
+    """查表执行 SmartPlayer 规则的玩家，决策与 SmartPlayer 完全一致（只支持两人两张牌）"""
+
+    def __init__(self, name, rng=None, table=None):
+        super().__init__(name, rng)
+        self.table = smart_table() if table is None else table
+
+    decide_peek_initial = SmartPlayer.decide_peek_initial
+
+    def act(self, game):
+        own, own_order = _memory_codes(self.known_cards)
+        opp, opp_order = _memory_codes(self.known_opponent_cards)
+        index = state_index(own, own_order, opp, opp_order, _drawn_code(game.drawn_card),
+                            int(game.cabo_called))
+        action = int(self.table[index])
+        if action == PEEK_RANDOM:
+            unknown_positions = [i for i in range(HAND_SIZE) if i not in self.known_opponent_cards]
+            return peek_action(self.rng.choice(unknown_positions))
+        return action
+
+
+def table_policy(batch, games, drawn, table=None):
+    """BatchGame 用的查表策略，与 batch_game.smart_policy 等价"""
+    table = smart_table() if table is None else table
+    seat = batch.current[games].astype(np.intp)
+    index = np.zeros(games.size, dtype=np.intp)
+    for known, first in ((batch.known, batch.known_first), (batch.known_opp, batch.opp_first)):
+        memory = known[games, seat]
+        codes = np.where(memory != UNKNOWN, NUMBERS[memory], 0)
+        both = (memory != UNKNOWN).all(axis=1)
+        index = index * SLOT_CODES + codes[:, 0]
+        index = index * SLOT_CODES + codes[:, 1]
+        index = index * 2 + (both & (first[games, seat] == 1))
+    if drawn is None:
+        drawn_code = np.zeros(games.size, dtype=np.intp)
+    else:
+        drawn_code = np.where(drawn == PEEK_ID, DRAWN_PEEK,
+                              np.where(drawn == SWAP_ID, DRAWN_SWAP, NUMBERS[drawn]))
+    index = index * DRAWN_CODES + drawn_code
+    index = index * 2 + (batch.caller[games] != UNKNOWN)
+    actions = table[index]
+    if drawn is not None:
+        # 随机偷看：与 smart_policy 一样，两张都不知道时抛硬币
+        peek = actions == PEEK_RANDOM
+        coin = batch.rng.integers(0, HAND_SIZE, games.size)
+        actions = np.where(peek, PEEK + coin, actions).astype(np.int8)
+    return actions
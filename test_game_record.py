@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+import pytest
+
+from bench_scaling import make_game
+from game_record import GameRecorder, read_games, final_game
+
+
+def _record(num_players, hand_size, path, games=20):
+    game = make_game(num_players, hand_size)
+    expected = []
+    with GameRecorder(path) as recorder:
+        game.add_observer(recorder)
+        for _ in range(games):
+            game.reset_table()
+            game.run()
+            expected.append(([str(card) for player in game.players for card in player.hand],
+                             [str(card) for card in game.discard_pile]))
+    return expected
+
+
+def test_round_trip_larger_table():
+    """4人每人4张手牌的牌桌：回放出的终局与实际对局一致"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.cabr")
+        expected = _record(4, 4, path)
+        records = list(read_games(path))
+        assert [(r.num_players, r.hand_size) for r in records] == [(4, 4)] * len(expected)
+        for record, (hands, discards) in zip(records, expected):
+            game = final_game(record)
+            assert [str(card) for player in game.players for card in player.hand] == hands
+            assert [str(card) for card in game.discard_pile] == discards
+
+
+def test_rejects_table_beyond_byte_encoding():
+    """8人每人6张手牌的动作编码超过一个字节，发牌时就报错"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.cabr")
+        game = make_game(8, 6)
+        with GameRecorder(path) as recorder:
+            game.add_observer(recorder)
+            with pytest.raises(ValueError, match="动作编码"):
+                game.reset_table()
+                game.run()
+
+
+if __name__ == "__main__":
+    test_round_trip_larger_table()
+    test_rejects_table_beyond_byte_encoding()
+    print("对局记录回放与实际对局一致")
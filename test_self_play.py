@@ -0,0 +1,40 @@
+import numpy as np
+
+from train_ai_player import VecCaboEnv
+
+CABO_INDEX = 0     # QPlayer.decode_action(0) == "cabo"
+DISCARD_INDEX = 5  # 自我对弈时按摸牌后直接弃掉处理
+
+
+def _caller_bonus(score_diff):
+    bonus = min(5.0, 2.0 + abs(score_diff) / 10)
+    return bonus if score_diff >= 0 else -bonus
+
+
+def test_learner_cabo_carries_caller_bonus():
+    """学习席位叫Cabo后对手的回合结束对局，叫Cabo的终局奖励仍然记给学习席位"""
+    for seed in range(20):
+        env = VecCaboEnv(1, seed, self_play=True)
+        env.learner_seats[0] = env.seats[0]
+        _, rewards, dones = env.step(np.array([CABO_INDEX]))
+        assert not dones[0]
+        while not dones[0]:
+            _, rewards, dones = env.step(np.array([DISCARD_INDEX]))
+        assert env.caller_rewards[0] == np.float32(_caller_bonus(env.score_diffs[0]))
+        assert abs(env.caller_rewards[0]) >= 2
+
+
+def test_opponent_cabo_gives_learner_no_caller_bonus():
+    env = VecCaboEnv(1, 0, self_play=True)
+    env.learner_seats[0] = 1 - env.seats[0]
+    env.step(np.array([CABO_INDEX]))
+    dones = [False]
+    while not dones[0]:
+        _, _, dones = env.step(np.array([DISCARD_INDEX]))
+    assert env.caller_rewards[0] == 0
+
+
+if __name__ == "__main__":
+    test_learner_cabo_carries_caller_bonus()
+    test_opponent_cabo_gives_learner_no_caller_bonus()
+    print("自我对弈中叫Cabo的终局奖励记给学习席位")
@@ -0,0 +1,90 @@
+import random
+
+import numpy as np
+
+from game_cabo import (Game, Card, HAND_SIZE, DRAW, CABO, DISCARD, replace_action, peek_action,
+                       swap_action)
+from smart_cabo_players import SmartPlayer
+from batch_game import BatchGame, smart_policy
+from smart_table import (TablePlayer, smart_table, table_policy, state_index, PEEK_RANDOM,
+                         SLOT_CODES, DRAWN_CODES, DRAWN_PEEK, DRAWN_SWAP)
+
+
+def test_table_matches_rules():
+    """逐个信息状态比较：查表结果与 SmartPlayer 三个规则方法的结论一致"""
+    table = smart_table()
+    player = SmartPlayer("规则")
+    drawn_cards = [None] + [Card(number) for number in range(1, 6)] + [Card(5, 'Peek'), Card(5, 'Swap')]
+    for index in range(table.size):
+        rest = index
+        cabo_called, rest = rest % 2, rest // 2
+        drawn, rest = rest % DRAWN_CODES, rest // DRAWN_CODES
+        opp_order, rest = rest % 2, rest // 2
+        opp = [0, 0]
+        opp[1], rest = rest % SLOT_CODES, rest // SLOT_CODES
+        opp[0], rest = rest % SLOT_CODES, rest // SLOT_CODES
+        own_order, rest = rest % 2, rest // 2
+        own = [0, 0]
+        own[1], rest = rest % SLOT_CODES, rest // SLOT_CODES
+        own[0] = rest
+        assert state_index(own, own_order, opp, opp_order, drawn, cabo_called) == index
+
+        own_memory = {pos: Card(own[pos]) for pos in ((1, 0) if own_order else (0, 1)) if own[pos]}
+        opp_memory = {pos: Card(opp[pos]) for pos in ((1, 0) if opp_order else (0, 1)) if opp[pos]}
+        card = drawn_cards[drawn]
+        action = int(table[index])
+        if card is None:
+            expected = CABO if not cabo_called and _call(player, own_memory) else DRAW
+            assert action == expected, (index, action)
+            continue
+        decision = player.decide_action_for_drawn_card(card, own_memory)
+        if decision == "use" and drawn == DRAWN_PEEK:
+            unknown = [i for i in range(HAND_SIZE) if i not in opp_memory]
+            if len(unknown) > 1:
+                assert action == PEEK_RANDOM
+            elif unknown:
+                assert action == peek_action(unknown[0])
+            else:
+                assert action == DISCARD
+        elif decision == "use" and drawn == DRAWN_SWAP:
+            swap = player.decide_swap_with_opponent(own_memory, opp_memory)
+            assert action == (swap_action(*swap) if swap else DISCARD)
+        elif isinstance(decision, tuple):
+            assert action == replace_action(decision[1])
+        else:
+            assert action == DISCARD
+
+
+def _call(player, memory):
+    player.known_cards = memory
+    player.hand = [None] * HAND_SIZE
+    return player.should_call_cabo()
+
+
+def test_table_player_plays_like_smart_player():
+    """同样的种子下 TablePlayer 和 SmartPlayer 打出完全相同的对局"""
+    for seed in range(2000):
+        results = []
+        for cls in (SmartPlayer, TablePlayer):
+            rng = random.Random(seed)
+            game = Game(rng=rng)
+            game.players = [cls("A", rng), cls("B", rng)]
+            scores = game.run()
+            results.append((scores, [str(card) for card in game.discard_pile]))
+        assert results[0] == results[1], seed
+
+
+def test_table_policy_matches_smart_policy():
+    a = BatchGame(20000, seed=7)
+    b = BatchGame(20000, seed=7)
+    a.run([smart_policy, smart_policy])
+    b.run([table_policy, table_policy])
+    assert np.array_equal(a.final_scores(), b.final_scores())
+    assert np.array_equal(a.hands, b.hands)
+
+
+if __name__ == "__main__":
+    test_table_matches_rules()
+    test_table_player_plays_like_smart_player()
+    test_table_policy_matches_smart_policy()
+    print("决策表与 SmartPlayer 规则一致")
@@ -0,0 +1,239 @@
+import math
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from game_cabo import Game, split_seed
+from deal_index import NUM_DEALS, deal_cards
+from agents import AGENTS, create_agent
+
+Z_95 = 1.96  # 95%置信区间
+
+
+def fixed_deals(num_deals, seed=0):
+    """固定的牌局编号集合：同样的种子总是得到同样的牌局，不同次运行的结果可以直接比较"""
+    return random.Random(seed).sample(range(NUM_DEALS), num_deals)
+
+
+def play_deal_pair(player_a, player_b, rank):
+    """同一牌局打两遍（a先手、b先手），返回两局中 a 视角的最终得分差（对手得分 - a的得分）"""
+    diffs = []
+    for players in ((player_a, player_b), (player_b, player_a)):
+        game = Game()
+        game.players = list(players)
+        game.reset_table(deal_cards(rank))
+        scores = game.run()
+        mine = players.index(player_a)
+        diffs.append(scores[1 - mine] - scores[mine])
+    return tuple(diffs)
+
+
+def play_match(name_a, name_b, ranks, seed):
+    """进程池任务：两个AI在一组牌局上对战，返回每个牌局的 (a先手得分差, b先手得分差)"""
+    player_a = create_agent(name_a, split_seed(seed, 0))
+    player_b = create_agent(name_b, split_seed(seed, 1))
+    try:
+        return [play_deal_pair(player_a, player_b, rank) for rank in ranks]
+    finally:
+        for player in (player_a, player_b):
+            if hasattr(player, 'close'):
+                player.close()
+
+
+def summarize(diffs):
+    """按局统计：胜率（平局算半场）和平均得分差，各带95%置信区间的半宽"""
+    n = len(diffs)
+    points = [1.0 if d > 0 else 0.5 if d == 0 else 0.0 for d in diffs]
+    win_rate = sum(points) / n
+    mean_diff = sum(diffs) / n
+    var_points = sum((p - win_rate) ** 2 for p in points) / max(1, n - 1)
+    var_diff = sum((d - mean_diff) ** 2 for d in diffs) / max(1, n - 1)
+    return {
+        'games': n,
+        'win_rate': win_rate,
+        'win_ci': Z_95 * math.sqrt(var_points / n),
+        'score_diff': mean_diff,
+        'diff_ci': Z_95 * math.sqrt(var_diff / n),
+    }
+
+
+def elo_ratings(pair_stats, agents, iterations=1000):
+    """用 Bradley-Terry 模型拟合各AI的Elo（平均为0）
+
+    每对AI额外加一局虚拟平局，避免全胜或全负时评分发散。
+    """
+    wins = {name: 0.0 for name in agents}
+    games = {}
+    for (a, b), stats in pair_stats.items():
+        n = stats['games'] + 1
+        score_a = stats['win_rate'] * stats['games'] + 0.5
+        wins[a] += score_a
+        wins[b] += n - score_a
+        games[a, b] = games[b, a] = n
+    strength = {name: 1.0 for name in agents}
+    for _ in range(iterations):
+        for name in agents:
+            denom = sum(n / (strength[name] + strength[other])
+                        for (me, other), n in games.items() if me == name)
+            if denom:
+                strength[name] = wins[name] / denom
+        # 固定几何平均为1
+        scale = math.exp(sum(math.log(s) for s in strength.values()) / len(strength))
+        strength = {name: s / scale for name, s in strength.items()}
+    return {name: 400 * math.log10(s) for name, s in strength.items()}
+
+
+def run_tournament(agents=None, num_deals=500, seed=0, deals=None, workers=None, chunk_size=50):
+    """所有AI两两对战的循环赛；每对AI在同一组固定牌局上各打先手、后手一次
+
+    返回 {'agents', 'deals', 'pairs': {(a, b): {'paired', 统计...}}, 'elo'}，
+    其中 paired 是每个牌局 a 视角的 (a先手得分差, b先手得分差)。
+    """
+    agents = list(AGENTS) if agents is None else list(agents)
+    ranks = fixed_deals(num_deals, seed) if deals is None else list(deals)
+    chunks = [ranks[i:i + chunk_size] for i in range(0, len(ranks), chunk_size)]
+    pairs = list(combinations(agents, 2))
+
+    with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+        jobs = {pair: [pool.submit(play_match, *pair, chunk, split_seed(seed, f"{pair}/{i}"))
+                       for i, chunk in enumerate(chunks)]
+                for pair in pairs}
+        paired = {pair: [result for job in pair_jobs for result in job.result()]
+                  for pair, pair_jobs in jobs.items()}
+
+    pair_stats = {}
+    for pair, results in paired.items():
+        stats = summarize([d for deal in results for d in deal])
+        stats['paired'] = results
+        pair_stats[pair] = stats
+    return {'agents': agents, 'deals': ranks, 'pairs': pair_stats,
+            'elo': elo_ratings(pair_stats, agents)}
+
+
+def paired_evaluation(name_a, name_b, num_deals=1000, seed=0, deals=None, workers=None,
+                      chunk_size=50):
+    """配对牌局评估：两个AI在完全相同的牌局上各打先手、后手，以牌局为单位比较
+
+    牌局本身的好坏在配对差中抵消，返回 a 视角的平均得分差、标准误，
+    以及与同样局数的独立对局相比方差缩小的倍数（即相当于多少倍的独立局数）。
+    """
+    ranks = fixed_deals(num_deals, seed) if deals is None else list(deals)
+    chunks = [ranks[i:i + chunk_size] for i in range(0, len(ranks), chunk_size)]
+    with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+        jobs = [pool.submit(play_match, name_a, name_b, chunk, split_seed(seed, f"{name_a}/{name_b}/{i}"))
+                for i, chunk in enumerate(chunks)]
+        paired = [result for job in jobs for result in job.result()]
+    return paired_stats(paired)
+
+
+def paired_stats(paired):
+    """由每个牌局的 (a先手得分差, b先手得分差) 计算配对差的均值和标准误"""
+    n = len(paired)
+    deal_means = [(first + second) / 2 for first, second in paired]
+    mean = sum(deal_means) / n
+    var_deal = sum((d - mean) ** 2 for d in deal_means) / max(1, n - 1)
+    games = [d for deal in paired for d in deal]
+    var_game = sum((d - mean) ** 2 for d in games) / max(1, len(games) - 1)
+    return {
+        'deals': n,
+        'score_diff': mean,
+        'stderr': math.sqrt(var_deal / n),
+        'unpaired_stderr': math.sqrt(var_game / len(games)),
+        'variance_reduction': var_game / (2 * var_deal) if var_deal else math.inf,
+    }
+
+
+def elo_to_score(elo):
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def sprt_llr(deal_points, elo0, elo1):
+    """配对牌局（每局 0/0.25/.../1 分）上 H1: elo1 对 H0: elo0 的对数似然比（正态近似）"""
+    n = len(deal_points)
+    if n < 2:
+        return 0.0
+    mean = sum(deal_points) / n
+    var = sum((p - mean) ** 2 for p in deal_points) / n
+    if var == 0:
+        return 0.0
+    s0, s1 = elo_to_score(elo0), elo_to_score(elo1)
+    return n * (s1 - s0) * (2 * mean - s0 - s1) / (2 * var)
+
+
+def sprt(name_a, name_b, elo0=0.0, elo1=5.0, alpha=0.05, beta=0.05, max_deals=50000, seed=0,
+         workers=None, batch_size=100):
+    """序贯概率比检验：a 相对 b 的Elo是 elo1（接受H1）还是 elo0（接受H0）
+
+    在固定牌局序列上按批并行对战（每个牌局各打先手、后手），每收到一批结果更新对数似然比，
+    越过边界立即停止；打完 max_deals 个牌局仍未判定时结果为 None。
+    """
+    lower = math.log(beta / (1 - alpha))
+    upper = math.log((1 - beta) / alpha)
+    ranks = fixed_deals(max_deals, seed)
+    batches = [ranks[i:i + batch_size] for i in range(0, len(ranks), batch_size)]
+    workers = workers or os.cpu_count()
+    deal_points = []
+    llr = 0.0
+    result = None
+    pool = ProcessPoolExecutor(workers)
+    try:
+        pending = deque()
+        submitted = 0
+        while result is None:
+            # 保持每个进程都有活干，按提交顺序读取结果，保证结果可复现
+            while submitted < len(batches) and len(pending) < 2 * workers:
+                pending.append(pool.submit(play_match, name_a, name_b, batches[submitted],
+                                           split_seed(seed, f"{name_a}/{name_b}/{submitted}")))
+                submitted += 1
+            if not pending:
+                break
+            for diffs in pending.popleft().result():
+                deal_points.append(sum(1.0 if d > 0 else 0.5 if d == 0 else 0.0 for d in diffs) / 2)
+            llr = sprt_llr(deal_points, elo0, elo1)
+            if llr >= upper:
+                result = 'H1'
+            elif llr <= lower:
+                result = 'H0'
+    finally:
+        pool.shutdown(cancel_futures=True)
+    score = sum(deal_points) / len(deal_points)
+    return {'result': result, 'deals': len(deal_points), 'llr': llr, 'bounds': (lower, upper),
+            'score': score, 'elo': score_to_elo(score)}
+
+
+def print_report(result):
+    print(f"\n{len(result['deals'])} 个固定牌局，每对AI各打先后手共 {2 * len(result['deals'])} 局")
+    print(f"\n{'对局':<16} {'胜率':>16} {'平均得分差':>18}")
+    for (a, b), stats in result['pairs'].items():
+        print(f"{a + ' vs ' + b:<16} {stats['win_rate']:>9.3f} ± {stats['win_ci']:.3f}"
+              f" {stats['score_diff']:>+11.3f} ± {stats['diff_ci']:.3f}")
+    print("\nElo:")
+    for name, elo in sorted(result['elo'].items(), key=lambda item: -item[1]):
+        print(f"  {name:<10} {elo:>+7.0f}")
+
+
+def print_paired(name_a, name_b, stats):
+    print(f"\n{name_a} vs {name_b}: {stats['deals']} 个配对牌局")
+    print(f"平均得分差 {stats['score_diff']:+.3f} ± {Z_95 * stats['stderr']:.3f}"
+          f"（独立对局同样局数为 ± {Z_95 * stats['unpaired_stderr']:.3f}，"
+          f"方差缩小 {stats['variance_reduction']:.1f} 倍）")
+
+
+def print_sprt(name_a, name_b, result):
+    verdict = {'H1': "接受H1（新AI更强）", 'H0': "接受H0（没有变强）", None: "未判定"}[result['result']]
+    print(f"\n{name_a} vs {name_b}: SPRT {verdict}，{result['deals']} 个牌局，"
+          f"LLR {result['llr']:.2f} ∈ ({result['bounds'][0]:.2f}, {result['bounds'][1]:.2f})，"
+          f"得分率 {result['score']:.3f}（Elo {result['elo']:+.0f}）")
+
+
+if __name__ == "__main__":
+    print_report(run_tournament(agents=[name for name in AGENTS if name != "mcts"]))
+    print_paired("smart", "random", paired_evaluation("smart", "random"))
+    print_sprt("smart", "random", sprt("smart", "random", elo0=0, elo1=20))
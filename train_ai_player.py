@@ -1,14 +1,167 @@
-from game_cabo import Game, Player, Card
+from game_cabo import (Game, Card, DRAW, CABO, DISCARD,
+                       replace_action, peek_action, swap_action, make_rng, split_seed)
+from dqn_numpy import QPlayer, save_artifact
 import torch
 import torch.nn as nn
 import torch.optim as optim
 import numpy as np
-from collections import deque, namedtuple
-import random
+from collections import deque
 import os
 import torch.nn.functional as F
 
-Experience = namedtuple('Experience', ('state', 'action', 'reward', 'next_state', 'done'))
+class ReplayMemory:
+    """固定容量的环形经验池，按列存储（状态、下一状态为 (capacity, state_size) 的 float32）
+
+    数组在第一次写入时才分配，所以只用来对局的 CaboAIPlayer 不占内存。
+    sample 用向量化的下标抽样，直接返回张量。
+    """
+
+    def __init__(self, capacity, state_size, rng=None):
+        self.capacity = capacity
+        self.state_size = state_size
+        # 抽样下标用的NumPy生成器，从玩家的随机数来源派生，传入种子时可以复现
+        self.np_rng = np.random.default_rng(make_rng(rng).getrandbits(64))
+        self.size = 0
+        self.pos = 0  # 下一次写入的位置
+        self.states = None
+
+    def _allocate(self):
+        self.states = np.zeros((self.capacity, self.state_size), dtype=np.float32)
+        self.next_states = np.zeros((self.capacity, self.state_size), dtype=np.float32)
+        self.actions = np.zeros(self.capacity, dtype=np.int64)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=np.float32)
+
+    def __len__(self):
+        return self.size
+
+    def append(self, state, action, reward, next_state, done):
+        if self.states is None:
+            self._allocate()
+        i = self.pos
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.pos = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        """一次写入一批经验（超过容量时只保留最后 capacity 条）"""
+        if self.states is None:
+            self._allocate()
+        n = min(len(actions), self.capacity)
+        indices = (self.pos + np.arange(n)) % self.capacity
+        for column, values in ((self.states, states), (self.actions, actions),
+                               (self.rewards, rewards), (self.next_states, next_states),
+                               (self.dones, dones)):
+            column[indices] = values[len(values) - n:]
+        self.pos = (self.pos + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+        return indices
+
+    def sample_indices(self, batch_size):
+        return self.np_rng.integers(0, self.size, batch_size)
+
+    def tensors(self, indices):
+        """取出这些下标的经验：状态、动作 (B, 1)、奖励、下一状态、是否结束"""
+        return (torch.from_numpy(self.states[indices]),
+                torch.from_numpy(self.actions[indices]).unsqueeze(1),
+                torch.from_numpy(self.rewards[indices]),
+                torch.from_numpy(self.next_states[indices]),
+                torch.from_numpy(self.dones[indices]))
+
+    def sample(self, batch_size):
+        return self.tensors(self.sample_indices(batch_size))
+
+
+class SumTree:
+    """求和树：叶子是各条经验的优先级，内部节点是子树之和
+
+    按前缀和抽样和更新优先级都是 O(log n)，并且对一整批下标向量化执行。
+    叶子数取不小于容量的2的幂，节点 i 的子节点是 2i 和 2i+1，根是节点1。
+    """
+
+    def __init__(self, capacity):
+        self.leaves = 1 << max(0, capacity - 1).bit_length()
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices) + self.leaves
+        self.tree[nodes] = priorities
+        nodes = np.unique(nodes // 2)
+        while nodes.size and nodes[0] >= 1:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes = np.unique(nodes // 2)
+
+    def find(self, values):
+        """返回前缀和落在 values 处的叶子下标"""
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            right = values >= self.tree[left]
+            values -= np.where(right, self.tree[left], 0.0)
+            nodes = left + right
+        return nodes - self.leaves
+
+    def priorities(self, indices):
+        return self.tree[np.asarray(indices) + self.leaves]
+
+
+class PrioritizedReplayMemory(ReplayMemory):
+    """按 TD 误差加权抽样的经验池（优先级 p^alpha，重要性采样权重 (N·P)^-beta）
+
+    新经验取当前最大优先级，保证至少被抽到一次；beta 在 beta_steps 次抽样内线性升到1。
+    """
+
+    def __init__(self, capacity, state_size, rng=None, alpha=0.6, beta=0.4, beta_steps=100000,
+                 epsilon=1e-3):
+        super().__init__(capacity, state_size, rng)
+        self.alpha = alpha
+        self.beta_start = beta
+        self.beta_steps = beta_steps
+        self.epsilon = epsilon  # TD误差为0的经验也保留一点被抽到的机会
+        self.tree = SumTree(capacity)
+        self.max_priority = 1.0
+        self.sampled = 0
+
+    @property
+    def beta(self):
+        return min(1.0, self.beta_start + (1.0 - self.beta_start) * self.sampled / self.beta_steps)
+
+    def append(self, state, action, reward, next_state, done):
+        self.tree.update([self.pos], [self.max_priority])
+        super().append(state, action, reward, next_state, done)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        indices = super().extend(states, actions, rewards, next_states, dones)
+        self.tree.update(indices, np.full(len(indices), self.max_priority))
+        return indices
+
+    def sample_indices(self, batch_size):
+        # 分层抽样：把总优先级等分成 batch_size 段，每段抽一个前缀和
+        segment = self.tree.total() / batch_size
+        values = (np.arange(batch_size) + self.np_rng.random(batch_size)) * segment
+        indices = self.tree.find(values)
+        # 浮点误差可能落到还没写入的叶子上
+        return np.minimum(indices, self.size - 1)
+
+    def weights(self, indices):
+        """重要性采样权重，按本批最大值归一化到 (0, 1]"""
+        probs = self.tree.priorities(indices) / self.tree.total()
+        weights = (self.size * probs) ** -self.beta
+        self.sampled += 1
+        return torch.from_numpy((weights / weights.max()).astype(np.float32))
+
+    def update_priorities(self, indices, td_errors):
+        priorities = (np.abs(td_errors) + self.epsilon) ** self.alpha
+        self.tree.update(indices, priorities)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
 
 class DQN(nn.Module):
     def __init__(self, input_size, output_size):
@@ -36,14 +189,34 @@ class DQN(nn.Module):
         x = F.relu(self.ln3(self.fc3(x)))
         return self.fc4(x)
 
-class CaboAIPlayer(Player):
-    def __init__(self, name):
-        super().__init__(name)
-        self.state_size = 13
-        self.action_size = 6
+def frozen_model(model):
+    """复制一份只用于推理的网络：不求梯度，处于 eval 模式"""
+    copy = DQN(model.fc1.in_features, model.fc4.out_features)
+    copy.load_state_dict(model.state_dict())
+    copy.eval()
+    return copy.requires_grad_(False)
+
+class DQNPlayer(QPlayer):
+    """只用DQN选动作的玩家，不带目标网络、优化器和经验池（对手池、对局用）"""
+
+    def __init__(self, name, rng=None, model=None):
+        super().__init__(name, rng)
+        if model is None:
+            model = DQN(self.state_size, self.action_size).eval().requires_grad_(False)
+        self.model = model
+
+    def q_values(self, states):
+        with torch.no_grad():
+            return self.model(torch.as_tensor(states, dtype=torch.float32)).numpy()
+
+class CaboAIPlayer(DQNPlayer):
+    def __init__(self, name, rng=None, prioritized=False):
+        super().__init__(name, rng, DQN(self.state_size, self.action_size))
         
-        # 增加经验池大小和批量大小
-        self.memory = deque(maxlen=200000)
+        # 增加经验池大小和批量大小；prioritized 时按TD误差优先回放（终局的大奖励更常被抽到）
+        self.prioritized = prioritized
+        memory_class = PrioritizedReplayMemory if prioritized else ReplayMemory
+        self.memory = memory_class(200000, self.state_size, self.rng)
         self.gamma = 0.99
         self.epsilon = 1.0
         self.epsilon_min = 0.01
@@ -54,7 +227,6 @@ class CaboAIPlayer(Player):
         self.target_update_freq = 10
         
         # 添加目标网络
-        self.model = DQN(self.state_size, self.action_size)
         self.target_model = DQN(self.state_size, self.action_size)
         self.update_target_model()
         
@@ -75,117 +247,54 @@ class CaboAIPlayer(Player):
             'epsilon': self.epsilon
         }, path)
 
-    def load_model(self, path):
-        """加载模型"""
-        if os.path.exists(path):
-            try:
-                checkpoint = torch.load(path)
-                self.model.load_state_dict(checkpoint['model_state_dict'])
-                self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
-                self.epsilon = checkpoint['epsilon']
-            except RuntimeError as e:
-                print("警告: 模型结构已更改，将使用新的模型结构开始训练")
-                # 如果加载失败，就使用新的模型继续训练
-                pass
-
-    def decode_action(self, action_idx):
-        """将动作索引解码为具体操作"""
-        if action_idx == 0:
-            return "cabo"
-        elif action_idx == 1:
-            return "peek"
-        elif action_idx == 2:
-            return "swap"
-        elif action_idx == 3:
-            return "swap_pos_1"
-        elif action_idx == 4:
-            return "swap_pos_2"
-        else:
-            return "discard"
-
-    def encode_state(self, game_state):
-        """改进状态编码，添加更多信息"""
-        state = []
-        # 编码自己已知的牌
-        known_sum = 0
-        known_count = 0
-        for i in range(2):
-            if i in self.known_cards:
-                card = self.known_cards[i]
-                state.extend([card.number / 5, 1])
-                known_sum += card.number
-                known_count += 1
-            else:
-                state.extend([0, 0])
-        
-        # 添加平均分信息
-        avg_score = known_sum / max(1, known_count)
-        state.append(avg_score / 5)
-        
-        # 编码对手已知的牌
-        opp_known_sum = 0
-        opp_known_count = 0
-        for i in range(2):
-            if i in self.known_opponent_cards:
-                card = self.known_opponent_cards[i]
-                state.extend([card.number / 5, 1])
-                opp_known_sum += card.number
-                opp_known_count += 1
-            else:
-                state.extend([0, 0])
-        
-        # 添加对手平均分信息
-        opp_avg_score = opp_known_sum / max(1, opp_known_count)
-        state.append(opp_avg_score / 5)
-        
-        # 编码牌堆和游戏状态信息
-        state.extend([
-            len(game_state.deck) / 10,  # 牌堆剩余比例
-            1 if game_state.cabo_called else 0,
-            1 if game_state.cabo_caller == self else 0
-        ])
-        
-        return np.array(state, dtype=np.float32)
+    def save_inference(self, path):
+        """只保存网络参数的推理文件（见 dqn_numpy.save_artifact），对局进程用它代替训练检查点"""
+        return save_artifact(self.model, path)
 
-    def choose_action(self, state):
-        """选择动作（epsilon-greedy策略）"""
-        if random.random() < self.epsilon:
-            return random.randrange(self.action_size)
-        
-        with torch.no_grad():
-            # 确保state是正确的形状
-            if isinstance(state, np.ndarray):
-                state = torch.FloatTensor(state)
-            state = state.unsqueeze(0)  # 添加batch维度
-            q_values = self.model(state)
-            return q_values.argmax().item()
+    def load_model(self, path, weights_only=False):
+        """加载训练检查点；weights_only 时只恢复网络参数，不恢复优化器状态和 epsilon
+
+        检查点的网络结构与当前模型不一致时抛出 ValueError。
+        """
+        if not os.path.exists(path):
+            return
+        checkpoint = torch.load(path, map_location='cpu')
+        state_dict = checkpoint['model_state_dict']
+        expected = self.model.state_dict()
+        problems = [f"缺少 {name}" for name in expected if name not in state_dict]
+        problems += [f"多出 {name}" for name in state_dict if name not in expected]
+        problems += [f"{name} 形状 {tuple(value.shape)}，模型需要 {tuple(expected[name].shape)}"
+                     for name, value in state_dict.items()
+                     if name in expected and value.shape != expected[name].shape]
+        if problems:
+            raise ValueError(f"检查点 {path} 与模型结构不一致: " + "; ".join(problems))
+        self.model.load_state_dict(state_dict)
+        if not weights_only:
+            self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
+            self.epsilon = checkpoint['epsilon']
 
     def remember(self, state, action, reward, next_state, done):
         """存储经验"""
-        self.memory.append(Experience(state, action, reward, next_state, done))
+        self.memory.append(state, action, reward, next_state, done)
 
     def replay(self, batch_size):
         if len(self.memory) < batch_size:
             return
         
-        experiences = random.sample(self.memory, batch_size)
-        states = np.array([exp.state for exp in experiences])
-        actions = np.array([exp.action for exp in experiences])
-        rewards = np.array([exp.reward for exp in experiences])
-        next_states = np.array([exp.next_state for exp in experiences])
-        dones = np.array([exp.done for exp in experiences])
-        
-        states = torch.FloatTensor(states)
-        actions = torch.LongTensor(actions).unsqueeze(1)
-        rewards = torch.FloatTensor(rewards)
-        next_states = torch.FloatTensor(next_states)
-        dones = torch.FloatTensor(dones)
+        indices = self.memory.sample_indices(batch_size)
+        states, actions, rewards, next_states, dones = self.memory.tensors(indices)
 
-        current_q = self.model(states).gather(1, actions)
+        current_q = self.model(states).gather(1, actions).squeeze(1)
         next_q = self.target_model(next_states).max(1)[0].detach()
         target_q = rewards + (1 - dones) * self.gamma * next_q
         
-        loss = F.smooth_l1_loss(current_q.squeeze(), target_q)
+        if self.prioritized:
+            # 用重要性采样权重抵消非均匀抽样带来的偏差
+            losses = F.smooth_l1_loss(current_q, target_q, reduction='none')
+            loss = (self.memory.weights(indices) * losses).mean()
+            self.memory.update_priorities(indices, (target_q - current_q).detach().numpy())
+        else:
+            loss = F.smooth_l1_loss(current_q, target_q)
         
         self.optimizer.zero_grad()
         loss.backward()
@@ -199,34 +308,30 @@ class CaboAIPlayer(Player):
         if self.epsilon > self.epsilon_min:
             self.epsilon *= self.epsilon_decay
 
-    def decide_peek_initial(self):
-        """决定初始要看哪张牌"""
-        # 随机选择一张未知的牌
-        unknown_positions = [i for i in range(2) if i not in self.known_cards]
-        return random.choice(unknown_positions)
-
 class CaboEnv(Game):
-    def __init__(self):
-        super().__init__()
-        self.players = [CaboAIPlayer("AI_1"), CaboAIPlayer("AI_2")]
+    single_seat = True  # 每步只执行当前席位的动作，不切换玩家
+
+    def __init__(self, rng=None, self_play=False, player_class=CaboAIPlayer):
+        """self_play 为真时两个席位轮流行动（每步执行当前席位的一个完整回合后轮到对方）
+
+        第二个席位从不训练，只用只做推理的 DQNPlayer；player_class 是第一个席位的玩家类。
+        """
+        super().__init__(rng=rng)
+        self.players = [player_class("AI_1", self.rng), DQNPlayer("AI_2", self.rng)]
+        self.self_play = self_play
+        self.single_seat = not self_play
         self.reset()
 
     def reset(self):
         """重置游戏环境"""
-        self.deck = self.create_deck()
-        self.discard_pile = []
-        self.current_player = 0
-        self.cabo_called = False
-        self.cabo_caller = None
-        
+        self.reset_table()
+
         # 发牌
-        for player in self.players:
-            for _ in range(2):
-                player.hand.append(self.deck.pop())
-        
+        self.deal()
+
         # 初始偷看
         for player in self.players:
-            pos = random.randint(0, 1)
+            pos = self.rng.randint(0, 1)
             player.peek_card(pos)
 
         return self.get_state()
@@ -239,11 +344,11 @@ class CaboEnv(Game):
     def step(self, action):
         """执行一步动作"""
         current_player = self.players[self.current_player]
-        opponent = self.players[1 - self.current_player]
         
         reward = 0
         done = False
         action_type = current_player.decode_action(action)
+        deck_size, cabo_called = len(self.deck), self.cabo_called
 
         # 基础奖励：根据已知牌的平均分数（缩小尺度）
         known_cards = list(current_player.known_cards.values())
@@ -251,11 +356,10 @@ class CaboEnv(Game):
             avg_score = sum(card.number for card in known_cards) / len(known_cards)
             reward -= min(1.0, avg_score / 10)  # 限制基础惩罚的大小
 
-        # 执行动作
+        # 执行动作（当前席位不会轮换，只使用引擎的单步动作）
         if action_type == "cabo":
             if not self.cabo_called:
-                self.cabo_called = True
-                self.cabo_caller = current_player
+                self.apply_move(CABO)
                 known_sum = sum(card.number for card in current_player.known_cards.values())
                 known_count = len(current_player.known_cards)
                 if known_count > 0 and (known_sum / known_count) <= 2:
@@ -266,61 +370,197 @@ class CaboEnv(Game):
                 reward -= 1
 
         elif action_type == "peek" and self.deck:
-            drawn_card = self.deck.pop()
-            if drawn_card.skill == "Peek":
+            self.apply_move(DRAW)
+            move = DISCARD
+            if self.drawn_card.skill == "Peek":
                 unknown_positions = [i for i in range(2) if i not in current_player.known_opponent_cards]
                 if unknown_positions:
-                    pos = random.choice(unknown_positions)
-                    peeked_card = opponent.hand[pos]
-                    current_player.peek_opponent_card(pos, peeked_card)
+                    move = peek_action(self.rng.choice(unknown_positions))
                     reward += 1
-            self.discard_pile.append(drawn_card)
+            self.apply_move(move)
 
         elif action_type == "swap" and self.deck:
-            drawn_card = self.deck.pop()
-            if drawn_card.skill == "Swap":
-                my_max_card = max(((i, card) for i, card in current_player.known_cards.items()),
-                                key=lambda x: x[1].number, default=(None, None))
-                opp_min_card = min(((i, card) for i, card in current_player.known_opponent_cards.items()),
-                                 key=lambda x: x[1].number, default=(None, None))
-                
-                if my_max_card[0] is not None and opp_min_card[0] is not None:
-                    my_pos, my_card = my_max_card
-                    opp_pos, opp_card = opp_min_card
-                    current_player.hand[my_pos], opponent.hand[opp_pos] = opponent.hand[opp_pos], current_player.hand[my_pos]
+            self.apply_move(DRAW)
+            move = DISCARD
+            if self.drawn_card.skill == "Swap":
+                swap_pos = current_player.choose_swap_positions()
+                if swap_pos:
+                    my_pos, opp_pos = swap_pos
+                    my_card = current_player.known_cards[my_pos]
+                    opp_card = current_player.known_opponent_cards[opp_pos]
+                    move = swap_action(my_pos, opp_pos)
                     reward += 1 if my_card.number > opp_card.number else -1
-
-            self.discard_pile.append(drawn_card)
+            self.apply_move(move)
 
         elif action_type.startswith("swap_pos") and self.deck:
-            drawn_card = self.deck.pop()
+            self.apply_move(DRAW)
+            drawn_card = self.drawn_card
+            move = DISCARD
             if not drawn_card.skill:
                 pos = int(action_type[-1]) - 1
                 if pos in current_player.known_cards:
                     old_card = current_player.hand[pos]
                     if drawn_card.number < old_card.number:
                         reward += min(2.0, (old_card.number - drawn_card.number) / 3)  # 限制奖励大小
-                    current_player.hand[pos] = drawn_card
-                    current_player.known_cards[pos] = drawn_card
-                    self.discard_pile.append(old_card)
+                    move = replace_action(pos)
+            self.apply_move(move)
 
-        # 游戏结束时的奖励
-        if not self.deck or (self.cabo_called and self.cabo_caller != current_player):
+        if self.self_play:
+            # 没执行任何动作时（重复叫Cabo、选择弃牌）按摸牌后直接弃掉处理，保证每个回合都有实际动作
+            if len(self.deck) == deck_size and self.cabo_called == cabo_called:
+                self.apply_move(DRAW)
+                self.apply_move(DISCARD)
+            self.end_turn()
+            done = self.game_over
+        elif not self.deck or (self.cabo_called and self.cabo_caller != current_player):
             done = True
-            if self.cabo_called:
-                caller_score = self.cabo_caller.total_score()
-                other_player = self.players[1 - self.players.index(self.cabo_caller)]
-                other_score = other_player.total_score()
-                
-                if self.cabo_caller == current_player:
-                    score_diff = other_score - caller_score
-                    if score_diff >= 0:
-                        reward += min(5.0, 2.0 + score_diff / 10)  # 限制最大奖励
-                    else:
-                        reward -= min(5.0, 2.0 + abs(score_diff) / 10)  # 限制最大惩罚
+            self.game_over = True
+            if self.observer is not None:
+                self.observer.on_end(self)
+
+        # 游戏结束时的奖励（自我对弈时终局总在对手的回合，由 VecCaboEnv 记给叫Cabo的一方）
+        if done and self.cabo_called and not self.self_play and self.cabo_caller == current_player:
+            reward += self.caller_reward()
 
         return self.get_state(), reward, done
 
+    def caller_reward(self):
+        """终局时叫Cabo一方的额外奖励：赢了加、输了扣 2 + 得分差/10（最多5）"""
+        if not self.cabo_called:
+            return 0.0
+        caller_score = self.cabo_caller.total_score()
+        other_player = self.players[1 - self.players.index(self.cabo_caller)]
+        score_diff = other_player.total_score() - caller_score
+        if score_diff >= 0:
+            return min(5.0, 2.0 + score_diff / 10)  # 限制最大奖励
+        return -min(5.0, 2.0 + abs(score_diff) / 10)  # 限制最大惩罚
+
+class VecCaboEnv:
+    """并排运行 M 个 CaboEnv：观测堆叠成 (M, 13)，step 接受动作向量，结束的环境自动重置
+
+    step 返回的是重置后的新观测（当前行动席位的视角，席位在 seats 里）；刚结束的环境
+    在 final_states 的对应行留下学习席位视角的终局观测，在 score_diffs 留下终局得分差
+    （对手 - 学习席位）。self_play 时两个席位轮流行动，每局开始随机决定学习席位
+    （learner_seats），否则学习席位总是0；自我对弈的终局若是学习席位叫的Cabo，
+    caller_rewards 的对应行留下它的 CaboEnv.caller_reward，应加到学习席位这局的最后一步上。
+    seed 给定时每个环境用 split_seed 派生各自的种子。
+    """
+
+    def __init__(self, num_envs, seed=None, self_play=False):
+        self.num_envs = num_envs
+        self.self_play = self_play
+        self.envs = [CaboEnv(None if seed is None else split_seed(seed, i), self_play, DQNPlayer)
+                     for i in range(num_envs)]
+        self.state_size = DQNPlayer.state_size
+        self.states = np.zeros((num_envs, self.state_size), dtype=np.float32)
+        self.final_states = np.zeros_like(self.states)
+        self.score_diffs = np.zeros(num_envs, dtype=np.float32)
+        self.caller_rewards = np.zeros(num_envs, dtype=np.float32)
+        self.seats = np.zeros(num_envs, dtype=np.int64)
+        self.learner_seats = np.zeros(num_envs, dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        for i in range(self.num_envs):
+            self._reset(i)
+        return self.states
+
+    def _reset(self, i):
+        env = self.envs[i]
+        env.reset()
+        if self.self_play:
+            self.learner_seats[i] = env.rng.randrange(2)
+        self._observe(i)
+
+    def _observe(self, i):
+        env = self.envs[i]
+        self.seats[i] = env.current_player
+        env.players[env.current_player].encode_state(env, self.states[i])
+
+    def step(self, actions):
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        for i, env in enumerate(self.envs):
+            _, rewards[i], dones[i] = env.step(int(actions[i]))
+            if dones[i]:
+                learner = env.players[self.learner_seats[i]]
+                opponent = env.players[1 - self.learner_seats[i]]
+                learner.encode_state(env, self.final_states[i])
+                self.score_diffs[i] = opponent.total_score() - learner.total_score()
+                learner_called = self.self_play and env.cabo_caller is learner
+                self.caller_rewards[i] = env.caller_reward() if learner_called else 0.0
+                self._reset(i)
+            else:
+                self._observe(i)
+        return self.states, rewards, dones
+
+
+def shaped_transitions(trajectory, final_state, score_diff, gamma):
+    """把一局的 (状态, 动作, 奖励) 序列变成经验：终局得分差/10 按折扣加到每一步的奖励上"""
+    final_reward = score_diff / 10.0
+    for t, (state, action, reward) in enumerate(trajectory):
+        reward += final_reward * gamma ** (len(trajectory) - t - 1)
+        last = t + 1 == len(trajectory)
+        next_state = final_state if last else trajectory[t + 1][0]
+        yield state, action, reward, next_state, last
+
+
+def train_ai_vec(save_path="cabo_ai_model.pth", episodes=100000, num_envs=32, seed=None,
+                 prioritized=False, replay_ratio=1.0):
+    """在 VecCaboEnv 上训练：M 个环境共用一次前向传播选动作
+
+    奖励塑形与 train_ai 相同（终局得分差按折扣加到整局每一步上）。replay_ratio 是每个环境步
+    做的经验回放次数：默认1与 train_ai 一致（每个批量步 M 次，epsilon 也按同样的速度衰减）；
+    调小可以换取更高的采样吞吐量，但每条经验被训练的次数和 epsilon 衰减都会相应变慢。
+    """
+    env = VecCaboEnv(num_envs, seed)
+    ai_player = CaboAIPlayer("AI_1", env.envs[0].rng, prioritized)
+    if os.path.exists(save_path):
+        ai_player.load_model(save_path)
+
+    best_reward = float('-inf')
+    rewards_window = deque(maxlen=100)
+    trajectories = [[] for _ in range(num_envs)]  # 每个环境当前这局的 (状态, 动作, 奖励)
+    states = env.states.copy()
+    finished = 0
+    replays = 0.0  # 累计欠下的回放次数，replay_ratio 不是 1/M 的整数倍时跨批量步累加
+
+    print(f"开始训练，{num_envs} 个并行环境，状态空间大小: {ai_player.state_size}, "
+          f"动作空间大小: {ai_player.action_size}")
+
+    while finished < episodes:
+        actions = ai_player.choose_actions(states)
+        next_states, rewards, dones = env.step(actions)
+        for i in range(num_envs):
+            trajectories[i].append((states[i].copy(), int(actions[i]), float(rewards[i])))
+            if not dones[i]:
+                continue
+            trajectory = trajectories[i]
+            for transition in shaped_transitions(trajectory, env.final_states[i].copy(),
+                                                 env.score_diffs[i], ai_player.gamma):
+                ai_player.remember(*transition)
+            total_reward = sum(reward for _, _, reward in trajectory)
+            trajectories[i] = []
+            rewards_window.append(total_reward)
+            finished += 1
+
+            if finished % 100 == 0:
+                avg_reward = sum(rewards_window) / len(rewards_window)
+                print(f"Episode: {finished}, Avg Reward: {avg_reward:.2f}, "
+                      f"Epsilon: {ai_player.epsilon:.3f}")
+                if avg_reward > best_reward:
+                    best_reward = avg_reward
+                    ai_player.save_model(save_path)
+        states[:] = next_states
+
+        if len(ai_player.memory) > ai_player.batch_size:
+            replays += num_envs * replay_ratio
+            while replays >= 1:
+                ai_player.replay(ai_player.batch_size)
+                replays -= 1
+
+    return ai_player
+
 def train_ai(save_path="cabo_ai_model.pth", episodes=100000):
     """改进训练过程"""
     env = CaboEnv()
@@ -328,11 +568,8 @@ def train_ai(save_path="cabo_ai_model.pth", episodes=100000):
     opponent = env.players[1]
     
     if os.path.exists(save_path):
-        try:
-            ai_player.load_model(save_path)
-        except:
-            os.remove(save_path)
-            print("删除旧的模型文件，使用新的模型结构开始训练")
+        # 结构不一致时 load_model 抛出 ValueError，保留原文件，由用户决定换路径还是删除
+        ai_player.load_model(save_path)
     
     best_reward = float('-inf')
     no_improvement_count = 0
@@ -0,0 +1,151 @@
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from smart_cabo_players import SmartPlayer
+from smart_table import smart_table, table_policy
+from batch_game import BatchGame, random_policy
+from deal_index import unrank_deck
+from tournament import fixed_deals
+
+# 每个阈值的搜索范围（连续参数，规则里都是与点数比较）
+PARAM_RANGES = {
+    'cabo_avg': (0.0, 4.0),
+    'cabo_sum': (0.0, 10.0),
+    'cabo_card': (0.0, 3.0),
+    'swap_mine': (1.0, 5.0),
+    'swap_theirs': (1.0, 5.0),
+}
+PARAM_NAMES = tuple(PARAM_RANGES)
+OPPONENTS = ('smart', 'random')  # 评估目标：对默认规则AI和随机基线的平均得分差
+
+
+def _opponent_policy(name):
+    if name == 'random':
+        return random_policy
+    if name == 'smart':
+        return lambda batch, games, drawn: table_policy(batch, games, drawn, smart_table())
+    raise ValueError(f"未知的对手: {name}")
+
+
+def evaluate(params, decks, seed=0, opponents=OPPONENTS):
+    """在固定牌局上用批量模拟评估一组阈值，返回对每个对手的平均得分差（对手得分 - 自己得分）
+
+    每个牌局各打先手、后手一次；候选参数先编译成决策表，所以整批对局是向量化的。
+    """
+    table = smart_table(**params)
+
+    def candidate(batch, games, drawn):
+        return table_policy(batch, games, drawn, table)
+
+    results = []
+    for i, name in enumerate(opponents):
+        opponent = _opponent_policy(name)
+        diff = 0.0
+        for seat in range(2):
+            batch = BatchGame(len(decks), seed=seed + 2 * i + seat, decks=decks)
+            batch.run([candidate, opponent] if seat == 0 else [opponent, candidate])
+            scores = batch.final_scores().astype(np.float64)
+            diff += (scores[:, 1 - seat] - scores[:, seat]).mean()
+        results.append(float(diff / 2))
+    return tuple(results)
+
+
+def _round(params):
+    # 阈值只与整数点数（或平均分的半整数）比较，取到0.5的倍数后等价的候选合并为一个
+    return {name: round(value * 2) / 2 for name, value in params.items()}
+
+
+def _evaluate_all(candidates, decks, seed, workers, opponents):
+    unique = []
+    for params in candidates:
+        params = _round(params)
+        if params not in unique:
+            unique.append(params)
+    with ProcessPoolExecutor(workers or os.cpu_count()) as pool:
+        scores = list(pool.map(evaluate, unique, itertools.repeat(decks),
+                               itertools.repeat(seed), itertools.repeat(opponents)))
+    return list(zip(unique, scores))
+
+
+def _decks(num_deals, seed):
+    return np.array([unrank_deck(rank) for rank in fixed_deals(num_deals, seed)], dtype=np.int8)
+
+
+def grid_search(grid, num_deals=5000, seed=0, workers=None, opponents=OPPONENTS):
+    """网格搜索：grid 为 {参数名: 候选值列表}，未给出的参数取默认值"""
+    names = list(grid)
+    candidates = [{**SmartPlayer.DEFAULT_PARAMS, **dict(zip(names, values))}
+                  for values in itertools.product(*(grid[name] for name in names))]
+    return _evaluate_all(candidates, _decks(num_deals, seed), seed, workers, opponents)
+
+
+def random_search(num_candidates, num_deals=5000, seed=0, workers=None, opponents=OPPONENTS):
+    """在 PARAM_RANGES 内均匀随机抽取候选"""
+    rng = random.Random(seed)
+    candidates = [{name: rng.uniform(*PARAM_RANGES[name]) for name in PARAM_NAMES}
+                  for _ in range(num_candidates)]
+    candidates.append(dict(SmartPlayer.DEFAULT_PARAMS))
+    return _evaluate_all(candidates, _decks(num_deals, seed), seed, workers, opponents)
+
+
+def evolution_search(generations=10, population=16, elite=4, num_deals=5000, seed=0, workers=None,
+                     opponents=OPPONENTS):
+    """简化的CMA式进化策略：每代从对角高斯分布采样，用最好的 elite 个候选更新均值和各维标准差
+
+    以对第一个对手的得分差为适应度，返回所有评估过的候选。
+    """
+    rng = random.Random(seed)
+    decks = _decks(num_deals, seed)
+    mean = {name: float(SmartPlayer.DEFAULT_PARAMS[name]) for name in PARAM_NAMES}
+    sigma = {name: (high - low) / 4 for name, (low, high) in PARAM_RANGES.items()}
+    seen = {}
+    for _ in range(generations):
+        candidates = [mean] + [
+            {name: min(max(rng.gauss(mean[name], sigma[name]), low), high)
+             for name, (low, high) in PARAM_RANGES.items()}
+            for _ in range(population - 1)]
+        new = [params for params in map(_round, candidates) if _key(params) not in seen]
+        for params, score in _evaluate_all(new, decks, seed, workers, opponents):
+            seen[_key(params)] = (params, score)
+        ranked = sorted((seen[_key(params)] for params in map(_round, candidates)),
+                        key=lambda item: -item[1][0])
+        best = [params for params, _ in ranked[:elite]]
+        for name in PARAM_NAMES:
+            values = [params[name] for params in best]
+            mean[name] = sum(values) / len(values)
+            spread = (sum((v - mean[name]) ** 2 for v in values) / len(values)) ** 0.5
+            # 标准差不低于半个点，避免过早收敛到取整后的同一个格点
+            sigma[name] = max(0.5, 0.5 * sigma[name] + 0.5 * spread)
+    return list(seen.values())
+
+
+def _key(params):
+    return tuple(params[name] for name in PARAM_NAMES)
+
+
+def pareto_front(results):
+    """返回在所有目标上都不被其他候选支配的 (参数, 得分差) 列表，按第一个目标从高到低排列"""
+    front = []
+    for params, score in results:
+        dominated = any(all(o >= s for o, s in zip(other, score)) and other != score
+                        for _, other in results)
+        if not dominated:
+            front.append((params, score))
+    return sorted(front, key=lambda item: -item[1][0])
+
+
+def print_front(results, opponents=OPPONENTS):
+    print(f"\n评估了 {len(results)} 组参数，Pareto最优:")
+    header = " ".join(f"{name:>11}" for name in PARAM_NAMES)
+    print(f"{header} " + " ".join(f"{'对' + name:>9}" for name in opponents))
+    for params, score in pareto_front(results):
+        print(" ".join(f"{params[name]:>11.1f}" for name in PARAM_NAMES) + " "
+              + " ".join(f"{s:>+9.3f}" for s in score))
+
+
+if __name__ == "__main__":
+    print_front(evolution_search())